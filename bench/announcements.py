@@ -0,0 +1,143 @@
+"""
+Fan-out of new announcements to idle /announcement/stream clients of server.py:
+
+    DATABASEURI=postgresql://... python3 server.py migrate
+    DATABASEURI=postgresql://... python3 bench/announcements.py --clients 5000
+
+Starts a server with room for --clients event streams, logs in as user1/pw1 and
+opens --clients streams with that session from one thread. Reports the server's
+memory (RSS of gunicorn and its workers) per open stream, then inserts --posts
+announcements straight into postgres, as another host would, and times how long
+each post takes to reach every stream: from the commit, through NOTIFY and the
+listener of every worker, to the event being read by the client.
+"""
+import http.client
+import os
+import selectors
+import socket
+import subprocess
+import sys
+import time
+
+import click
+from sqlalchemy import create_engine, text
+
+from auth import login
+from loadtest import SERVER, percentile, wait_until_up
+
+
+def server_rss(pid):
+  # resident memory of the process and its children, in bytes
+  pids = [pid]
+  for entry in os.listdir('/proc'):
+    if entry.isdigit():
+      try:
+        with open('/proc/%s/stat' % entry) as stat:
+          if int(stat.read().rsplit(')', 1)[1].split()[1]) == pid:
+            pids.append(int(entry))
+      except OSError:
+        pass
+  rss = 0
+  for child in pids:
+    with open('/proc/%d/status' % child) as status:
+      for line in status:
+        if line.startswith('VmRSS:'):
+          rss += int(line.split()[1]) * 1024
+  return rss
+
+
+def open_streams(port, cookie, clients, timeout=120):
+  """
+  Open the streams and wait for their response headers.
+  Returns the selector of the streams that were accepted and how many were refused.
+  """
+  selector = selectors.DefaultSelector()
+  request = ('GET /announcement/stream HTTP/1.1\r\nHost: 127.0.0.1\r\nCookie: %s\r\n\r\n' % cookie).encode()
+  pending = {}
+  refused = 0
+  for _ in range(clients):
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall(request)
+    sock.setblocking(False)
+    pending[sock] = b''
+    selector.register(sock, selectors.EVENT_READ)
+  deadline = time.time() + timeout
+  while pending and time.time() < deadline:
+    for key, _ in selector.select(1):
+      sock = key.fileobj
+      if sock not in pending:
+        continue
+      pending[sock] += sock.recv(65536)
+      if b'\r\n\r\n' in pending[sock]:
+        if not pending.pop(sock).startswith(b'HTTP/1.1 200'):
+          refused += 1
+          selector.unregister(sock)
+          sock.close()
+  if pending:
+    raise click.ClickException('%d streams got no answer' % len(pending))
+  return selector, refused
+
+
+def broadcast(engine, selector, streams, number, timeout=60):
+  # latency of one post to every stream, in seconds
+  start = time.perf_counter()
+  with engine.begin() as conn:
+    conn.execute(text("INSERT INTO ann_post (user_id, link, description) VALUES (1, :link, :description)"),
+                 {'link': 'bench', 'description': 'fan-out %d' % number})
+  latencies = []
+  waiting = set(streams)
+  deadline = time.time() + timeout
+  while waiting and time.time() < deadline:
+    for key, _ in selector.select(1):
+      data = key.fileobj.recv(65536)
+      if key.fileobj in waiting and b'data:' in data:
+        latencies.append(time.perf_counter() - start)
+        waiting.discard(key.fileobj)
+  return latencies, len(waiting)
+
+
+@click.command()
+@click.option('--clients', default=5000, type=int, help='Idle event streams to open.')
+@click.option('--posts', default=5, type=int, help='Announcements to broadcast.')
+@click.option('--workers', default=2, type=int)
+@click.option('--threads', default=4, type=int)
+@click.option('--port', default=8199, type=int, help='Port for the server started by this script.')
+def main(clients, posts, workers, threads, port):
+  engine = create_engine(os.environ['DATABASEURI'])
+  base_url = 'http://127.0.0.1:%d' % port
+  # any worker may accept any number of the streams
+  server = subprocess.Popen([sys.executable, SERVER, 'serve', '--workers', str(workers), '--threads', str(threads),
+                             '--streams', str(clients), '127.0.0.1', str(port)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+  try:
+    wait_until_up(base_url)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    cookie = login(conn, 1)
+    # every worker loads its feed
+    for _ in range(workers * 4):
+      conn.request('GET', '/announcement', headers={'Cookie': cookie})
+      conn.getresponse().read()
+    before = server_rss(server.pid)
+    start = time.perf_counter()
+    selector, refused = open_streams(port, cookie, clients)
+    opened = clients - refused
+    print("%d streams open in %.1fs, %d refused" % (opened, time.perf_counter() - start, refused))
+    time.sleep(2)
+    after = server_rss(server.pid)
+    print("server RSS %.1f MB -> %.1f MB, %.1f KB per stream" % (
+      before / 1e6, after / 1e6, (after - before) / max(opened, 1) / 1024))
+    streams = [key.fileobj for key in selector.get_map().values()]
+    for number in range(posts):
+      latencies, missed = broadcast(engine, selector, streams, number)
+      print("post %d reached %d streams   p50 %7.1f ms   p99 %7.1f ms   max %7.1f ms   missed %d" % (
+        number + 1, len(latencies), percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+        max(latencies or [0]) * 1000, missed))
+    for stream in streams:
+      stream.close()
+  finally:
+    server.terminate()
+    server.wait()
+
+
+if __name__ == '__main__':
+  main()
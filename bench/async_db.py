@@ -0,0 +1,201 @@
+"""
+server.py with ASYNC_DB off and on, at 1000 concurrent connections, against a
+local postgres made to look remote:
+
+    DATABASEURI=postgresql://... python3 bench/async_db.py --latency 20 --connections 1000
+
+A proxy in this script forwards the server's database connections to
+DATABASEURI and delays every message by --latency/2 milliseconds each way,
+so each round trip to postgres takes --latency ms longer, as from a web
+server in another datacenter. For each mode a server is started on the
+proxy and --connections client connections, spread over --users logged-in
+bench/seed.py users, load the database-bound pages (home, all recipes, a
+recipe's reviews, announcements) for --duration seconds. A category's recipes
+is left out: its thousands of cards make it bound by rendering, not by the
+database. Reports requests/sec, latency percentiles and failed requests
+(5xx, mostly pool timeouts, and dropped connections).
+"""
+import asyncio
+import http.client
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import click
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from auth import login
+from loadtest import SERVER, percentile, wait_until_up
+
+
+class LatencyProxy:
+  """
+  TCP proxy to postgres adding a fixed delay to every chunk, in both directions,
+  without reordering or throttling them. Runs in a process of its own, away
+  from the GIL of the client threads.
+  """
+  def __init__(self, target, port, delay):
+    self.target = target
+    self.port = port
+    self.delay = delay
+    ready = multiprocessing.Event()
+    self.process = multiprocessing.Process(target=self.run, args=(ready,), daemon=True)
+    self.process.start()
+    ready.wait()
+
+  def run(self, ready):
+    self.loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(self.loop)
+    server = self.loop.run_until_complete(asyncio.start_server(self.accept, '127.0.0.1', self.port, backlog=1024))
+    ready.set()
+    self.loop.run_until_complete(server.serve_forever())
+
+  def stop(self):
+    self.process.terminate()
+    self.process.join()
+
+  async def open_target(self):
+    host, port = self.target
+    if host.startswith('/'):
+      return await asyncio.open_unix_connection(os.path.join(host, '.s.PGSQL.%d' % port))
+    return await asyncio.open_connection(host, port)
+
+  async def accept(self, client_reader, client_writer):
+    server_reader, server_writer = await self.open_target()
+    await asyncio.gather(self.pipe(client_reader, server_writer), self.pipe(server_reader, client_writer))
+
+  async def pipe(self, reader, writer):
+    queue = asyncio.Queue()
+
+    async def deliver():
+      while True:
+        due, data = await queue.get()
+        if data is None:
+          break
+        await asyncio.sleep(max(0, due - self.loop.time()))
+        writer.write(data)
+        await writer.drain()
+      writer.close()
+
+    delivery = asyncio.ensure_future(deliver())
+    try:
+      while True:
+        data = await reader.read(65536)
+        if not data:
+          break
+        queue.put_nowait((self.loop.time() + self.delay, data))
+    except ConnectionError:
+      pass
+    queue.put_nowait((0, None))
+    try:
+      await delivery
+    except ConnectionError:
+      pass
+
+
+def proxied_uri(uri, port):
+  # the same database, reached through the proxy
+  url = make_url(uri)
+  return url.set(host='127.0.0.1', port=port, query={}).render_as_string(hide_password=False)
+
+
+def page_load(port, connections, users, duration, recipes, seed):
+  cookies = []
+  conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+  for user in range(1, users + 1):
+    cookies.append(login(conn, user))
+  latencies = []
+  errors = [0]
+  lock = threading.Lock()
+  start_line = threading.Barrier(connections)
+
+  def client(number):
+    rnd = random.Random(seed * 100003 + number)
+    cookie = cookies[number % users]
+    pages = [lambda: '/login/home',
+             lambda: '/loggedin_user_all_recipes',
+             lambda: '/review_page/%d' % rnd.randint(1, recipes),
+             lambda: '/announcement']
+    mine = []
+    failed = 0
+    conn = None
+    start_line.wait()
+    deadline = time.time() + duration
+    while time.time() < deadline:
+      if conn is None:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+      start = time.perf_counter()
+      try:
+        conn.request('GET', rnd.choice(pages)(), headers={'Cookie': cookie})
+        response = conn.getresponse()
+        response.read()
+        if response.status >= 500:
+          failed += 1
+        else:
+          mine.append(time.perf_counter() - start)
+      except (OSError, http.client.HTTPException):
+        failed += 1
+        conn.close()
+        conn = None
+    with lock:
+      latencies.extend(mine)
+      errors[0] += failed
+
+  threads = [threading.Thread(target=client, args=(number,)) for number in range(connections)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return latencies, errors[0]
+
+
+def compare(uri, proxy_port, latency, connections, users, workers, threads, duration, port, recipes, seed):
+  for async_db in ('0', '1'):
+    env = dict(os.environ, DATABASEURI=proxied_uri(uri, proxy_port), ASYNC_DB=async_db)
+    env.pop('ASYNC_DATABASEURI', None)
+    server = subprocess.Popen([sys.executable, SERVER, 'serve', '--workers', str(workers), '--threads', str(threads),
+                               '127.0.0.1', str(port)], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+      wait_until_up('http://127.0.0.1:%d' % port)
+      latencies, errors = page_load(port, connections, users, duration, recipes, seed)
+    finally:
+      server.terminate()
+      server.wait()
+    print("ASYNC_DB=%s  %d connections  +%.0f ms per round trip   %8.1f req/s   p50 %8.1f ms   p99 %8.1f ms   "
+          "failed %d" % (async_db, connections, latency, len(latencies) / duration, percentile(latencies, 50) * 1000,
+                         percentile(latencies, 99) * 1000, errors))
+
+
+
+@click.command()
+@click.option('--latency', default=20.0, type=float, help='Milliseconds added to each round trip to postgres.')
+@click.option('--connections', default=1000, type=int, help='Concurrent client connections.')
+@click.option('--users', default=50, type=int, help='Logged-in users the connections are spread over.')
+@click.option('--workers', default=2, type=int)
+@click.option('--threads', default=16, type=int)
+@click.option('--duration', default=30.0, type=float, help='Seconds of requests per mode.')
+@click.option('--port', default=8199, type=int, help='Port for the servers started by this script.')
+@click.option('--proxy-port', default=8198, type=int, help='Port of the latency proxy.')
+@click.option('--seed', default=4111, type=int)
+def main(latency, connections, users, workers, threads, duration, port, proxy_port, seed):
+  uri = os.environ['DATABASEURI']
+  url = make_url(uri)
+  host = url.host or parse_qs(urlsplit(uri).query).get('host', ['/tmp'])[0]
+  proxy = LatencyProxy((host, url.port or 5432), proxy_port, latency / 2000)
+  with create_engine(uri).connect() as conn:
+    recipes = conn.execute(text("SELECT max(recipe_id) FROM recipe_view")).scalar()
+  try:
+    compare(uri, proxy_port, latency, connections, users, workers, threads, duration, port, recipes, seed)
+  finally:
+    proxy.stop()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,117 @@
+"""
+Login throughput of server.py at several password hash costs, and the
+statements run per home page request:
+
+    DATABASEURI=postgresql://... python3 bench/auth.py --methods pbkdf2:sha256:10000,pbkdf2:sha256:100000
+
+For each PASSWORD_HASH_METHOD the passwords of users 1..--concurrency
+(bench/seed.py accounts, user<i>/pw<i>) are hashed with it, a server is started
+with it and every client thread logs in as its user over and over for
+--duration seconds. Then one client loads its home page --requests times and
+the statements per request are read from the Server-Timing header.
+Use --url to measure the home page of an already running server instead,
+e.g. an older revision.
+"""
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+import click
+from sqlalchemy import create_engine, text
+from werkzeug.security import generate_password_hash
+
+from loadtest import SERVER, STATEMENTS, percentile, wait_until_up
+
+
+def login(conn, user):
+  conn.request('POST', '/login', urlencode({'username': 'user%d' % user, 'password': 'pw%d' % user}),
+               {'Content-Type': 'application/x-www-form-urlencoded'})
+  response = conn.getresponse()
+  response.read()
+  if response.status != 302:
+    raise click.ClickException('login failed for user%d' % user)
+  return response.getheader('Set-Cookie').split(';')[0]
+
+
+def login_load(base_url, concurrency, duration):
+  parts = urlsplit(base_url)
+  latencies = []
+  lock = threading.Lock()
+  deadline = time.time() + duration
+
+  def client(user):
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    mine = []
+    while time.time() < deadline:
+      start = time.perf_counter()
+      login(conn, user)
+      mine.append(time.perf_counter() - start)
+    with lock:
+      latencies.extend(mine)
+
+  threads = [threading.Thread(target=client, args=(user,)) for user in range(1, concurrency + 1)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return latencies
+
+
+def home_statements(base_url, requests):
+  # statements of the first home page after login, and the mean of the next ones
+  parts = urlsplit(base_url)
+  conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+  cookie = login(conn, 1)
+  counts = []
+  for _ in range(requests):
+    conn.request('GET', '/login/home', headers={'Cookie': cookie})
+    response = conn.getresponse()
+    response.read()
+    statements = STATEMENTS.search(response.getheader('Server-Timing') or '')
+    counts.append(int(statements.group(1)) if statements else 0)
+  return counts[0], sum(counts[1:]) / max(len(counts) - 1, 1)
+
+
+@click.command()
+@click.option('--methods', default='pbkdf2:sha256:10000,pbkdf2:sha256:100000,pbkdf2:sha256:600000,scrypt:32768:8:1',
+              help='PASSWORD_HASH_METHOD values to compare.')
+@click.option('--workers', default=2, type=int)
+@click.option('--threads', default=4, type=int)
+@click.option('--port', default=8199, type=int, help='Port for the servers started by this script.')
+@click.option('--concurrency', default=16, type=int, help='Number of client threads, each logs in as its own user.')
+@click.option('--duration', default=10.0, type=float, help='Seconds of logins per method.')
+@click.option('--requests', default=50, type=int, help='Home page requests.')
+@click.option('--url', default=None, help='Only count the home page statements of an already running server.')
+def main(methods, workers, threads, port, concurrency, duration, requests, url):
+  if url:
+    first, rest = home_statements(url, requests)
+    print("%s: home page %d statements after login, %.1f per request after that" % (url, first, rest))
+    return
+  engine = create_engine(os.environ['DATABASEURI'])
+  base_url = 'http://127.0.0.1:%d' % port
+  for method in methods.split(','):
+    with engine.begin() as conn:
+      for user in range(1, concurrency + 1):
+        conn.execute(text("UPDATE users SET password = :password WHERE username = :username"),
+                     {'password': generate_password_hash('pw%d' % user, method=method), 'username': 'user%d' % user})
+    server = subprocess.Popen([sys.executable, SERVER, 'serve', '--workers', str(workers), '--threads', str(threads),
+                               '127.0.0.1', str(port)], env=dict(os.environ, PASSWORD_HASH_METHOD=method),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+      wait_until_up(base_url)
+      latencies = login_load(base_url, concurrency, duration)
+      first, rest = home_statements(base_url, requests)
+    finally:
+      server.terminate()
+      server.wait()
+    print("%-22s %8.1f logins/s   p50 %7.1f ms   p99 %7.1f ms   home page %d statements after login, %.1f after that" % (
+      method, len(latencies) / duration, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+      first, rest))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,76 @@
+"""
+Build time and serving latency of the "recommended for you" feeds of server.py,
+on a database filled by bench/seed.py:
+
+    DATABASEURI=postgresql://... python3 server.py migrate
+    DATABASEURI=postgresql://... python3 bench/seed.py --users 100000 --recipes 100000 --saves 1000000 --reset
+    DATABASEURI=postgresql://... python3 bench/feed.py
+
+Rebuilds every user's feed (as `server.py build-feeds --all` does) and reports
+feeds/sec, then times --requests reads of random users' feeds the way home()
+does, next to computing the same feed live with user_feed_recipes().
+--skip-build only measures serving.
+"""
+import os
+import random
+import sys
+import time
+
+import click
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import server
+from read_model import percentile
+
+
+def timed(run, user_ids):
+  timings = []
+  for user_id in user_ids:
+    start = time.perf_counter()
+    run(user_id)
+    timings.append(time.perf_counter() - start)
+  return timings
+
+
+def report(label, timings):
+  print("%-22s mean %8.2f ms   p50 %8.2f ms   p99 %8.2f ms" % (
+    label, sum(timings) / len(timings) * 1000, percentile(timings, 50) * 1000, percentile(timings, 99) * 1000))
+
+
+@click.command()
+@click.option('--requests', default=2000, type=int, help='Feed reads timed.')
+@click.option('--live-requests', default=200, type=int, help='Live feed computations timed.')
+@click.option('--seed', default=4111, type=int)
+@click.option('--skip-build', is_flag=True, help='Only measure serving the feeds already built.')
+def main(requests, live_requests, seed, skip_build):
+  rnd = random.Random(seed)
+  with server.engine.connect() as conn:
+    users, saves = conn.execute(text("SELECT (SELECT count(*) FROM users), (SELECT count(*) FROM saves)")).one()
+  print("%d users, %d saves" % (users, saves))
+
+  if not skip_build:
+    start = time.perf_counter()
+    built = server.build_feeds(everyone=True)
+    seconds = time.perf_counter() - start
+    print("built %d feeds in %.1fs, %.0f feeds/s" % (built, seconds, built / seconds))
+
+  with server.engine.connect() as conn:
+    user_ids = conn.execute(text("SELECT user_id FROM user_feed")).scalars().all()
+    sizes = conn.execute(text("SELECT avg(cardinality(recipe_ids)), pg_total_relation_size('user_feed') \
+                               FROM user_feed")).one()
+    print("%d feeds, %.1f recipes per feed, %.1f MB" % (len(user_ids), sizes[0] or 0, sizes[1] / 1e6))
+    served = timed(lambda user_id: server.run_query(server.HOME_FEED, {'user_id': user_id}, conn).fetchall(),
+                   rnd.choices(user_ids, k=requests))
+    report('precomputed feed', served)
+    params = {'size': server.app.config['FEED_SIZE'], 'history': server.app.config['FEED_HISTORY'],
+              'neighbours': server.app.config['FEED_NEIGHBOURS']}
+    live = timed(lambda user_id: conn.execute(text("SELECT user_feed_recipes(:user_id, :size, :history, :neighbours)"),
+                                              dict(params, user_id=user_id)).scalar(),
+                 rnd.choices(user_ids, k=live_requests))
+    report('computed live', live)
+    conn.rollback()
+
+
+if __name__ == '__main__':
+  main()
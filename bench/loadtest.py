@@ -0,0 +1,327 @@
+"""
+HTTP load test for server.py.
+
+Starts the server under each worker configuration, runs concurrent client
+threads for a fixed time and reports, per route, requests/sec, p50/p95/p99
+latency and the DB statements per request (from the Server-Timing header):
+
+    python3 bench/loadtest.py --configs 1x4,2x4,4x4 --duration 10
+
+Without PATHS every client logs in as a user of bench/seed.py (user<i>/pw<i>)
+and browses like one: listings, categories, search, the pantry, its home
+page and saves, reviews and announcements, with an occasional save, unsave,
+review, recipe or announcement, and now and then a static page, a
+registration, a log out (and in again) or the announcement event stream.
+Popular recipes are picked more often (Zipf). With PATHS, anonymous clients
+fetch those paths round-robin instead:
+
+    python3 bench/loadtest.py /recipes /categories
+
+--save-baseline writes the results to a JSON file; --baseline compares a run
+with one and exits 1 when a route got slower (p95 beyond --tolerance) or
+runs more statements per request.
+An event stream is timed to its first line and then dropped; the servers
+started here get --streams threads for them and a 1 second heartbeat, so a
+dropped stream frees its thread soon after.
+Use --url to load test a server that is already running instead.
+"""
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import http.client
+from urllib.parse import urlencode, urlsplit
+
+import click
+
+from seed import WORDS, ingredient_name, zipf_weights
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server.py')
+
+STATEMENTS = re.compile(r'desc="(\d+) statements"')
+
+
+def percentile(values, p):
+  if not values:
+    return 0.0
+  values = sorted(values)
+  return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def wait_until_up(base_url, timeout=30):
+  parts = urlsplit(base_url)
+  deadline = time.time() + timeout
+  while time.time() < deadline:
+    try:
+      conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=1)
+      conn.request('GET', '/')
+      conn.getresponse().read()
+      return
+    except OSError:
+      time.sleep(0.2)
+  raise click.ClickException('server did not start on ' + base_url)
+
+
+class Browser:
+  """
+  One simulated user: what it requests next, as (label, method, path, form).
+  """
+  def __init__(self, number, users, recipes, categories, ingredients, seed):
+    self.rnd = random.Random(seed * 100003 + number)
+    self.user = number % users + 1
+    self.recipes = recipes
+    self.categories = categories
+    self.ingredients = ingredients
+    self.recipe_weights = zipf_weights(recipes, 1.1)
+    self.ingredient_weights = zipf_weights(ingredients, 1.1)
+    self.logged_out = False
+    # (label, weight, function returning (method, path, form))
+    self.steps = [
+      ('GET /', 5, lambda: ('GET', '/', None)),
+      ('GET /recipes', 10, lambda: ('GET', '/recipes', None)),
+      ('GET /categories', 5, lambda: ('GET', '/categories', None)),
+      ('GET /category/<id>/recipes', 10, lambda: ('GET', '/category/%d/recipes' % self.category(), None)),
+      ('GET /search', 8, lambda: ('GET', '/search?' + urlencode({'q': self.rnd.choice(WORDS)}), None)),
+      ('GET /cook', 3, lambda: ('GET', '/cook?' + urlencode({'pantry': ', '.join(self.pantry())}), None)),
+      ('GET /login/home', 10, lambda: ('GET', '/login/home', None)),
+      ('GET /loggedin_user_all_recipes', 10, lambda: ('GET', '/loggedin_user_all_recipes', None)),
+      ('GET /loggedin_user_saves', 8, lambda: ('GET', '/loggedin_user_saves', None)),
+      ('GET /review_page/<id>', 10, lambda: ('GET', '/review_page/%d' % self.recipe(), None)),
+      ('GET /announcement', 5, lambda: ('GET', '/announcement', None)),
+      ('POST /save_recipe/<id>', 4, lambda: ('POST', '/save_recipe/%d' % self.recipe(), {})),
+      ('POST /add_review/<id>', 2, lambda: ('POST', '/add_review/%d' % self.recipe(),
+                                            {'content': ' '.join(self.rnd.choices(WORDS, k=6)),
+                                             'like': self.rnd.choice(['0', '1'])})),
+      ('POST /user_new_announcement', 1, lambda: ('POST', '/user_new_announcement',
+                                                  {'content': ' '.join(self.rnd.choices(WORDS, k=8)), 'link': ''})),
+      ('POST /delete_saved_recipe/<id>', 2, lambda: ('POST', '/delete_saved_recipe/%d' % self.recipe(), {})),
+      ('GET /new_recipe', 1, lambda: ('GET', '/new_recipe', None)),
+      ('POST /user_new_recipe', 1, lambda: ('POST', '/user_new_recipe', dict(self.new_recipe(),
+                                            **{'ingredient_name[]': self.pantry()[:3], 'amount[]': ['1', '2', '3'],
+                                               'unit[]': ['g', 'g', 'cup'], 'category_id': self.category()}))),
+      ('POST /add_recipe', 0.5, lambda: ('POST', '/add_recipe', self.new_recipe())),
+      ('GET /announcement/stream', 1, lambda: ('GET', '/announcement/stream', None)),
+      ('GET /another', 0.5, lambda: ('GET', '/another', None)),
+      ('GET /interesting', 0.5, lambda: ('GET', '/interesting', None)),
+      ('POST /register', 0.2, lambda: ('POST', '/register', {'username': 'guest_' + uuid.uuid4().hex[:12],
+                                                             'password': 'pw', 'user_profile': ''})),
+      ('GET /logout', 0.2, self.logout),
+    ]
+    self.step_weights = [step[1] for step in self.steps]
+
+  def recipe(self):
+    return self.rnd.choices(range(1, self.recipes + 1), cum_weights=self.recipe_weights)[0]
+
+  def category(self):
+    return self.rnd.randint(1, self.categories)
+
+  def pantry(self):
+    ranks = self.rnd.choices(range(1, self.ingredients + 1), cum_weights=self.ingredient_weights, k=5)
+    return [ingredient_name(rank) for rank in ranks]
+
+  def new_recipe(self):
+    return {'name': ' '.join(self.rnd.choices(WORDS, k=3)), 'instruction': ' '.join(self.rnd.choices(WORDS, k=12)),
+            'prep_time': self.rnd.randint(5, 30), 'cook_time': self.rnd.randint(5, 90), 'serving': self.rnd.randint(1, 6)}
+
+  def logout(self):
+    # logged in again by the next step
+    self.logged_out = True
+    return ('GET', '/logout', None)
+
+  def login(self):
+    return ('POST /login', 'POST', '/login', {'username': 'user%d' % self.user, 'password': 'pw%d' % self.user})
+
+  def next(self):
+    if self.logged_out:
+      self.logged_out = False
+      return self.login()
+    label, weight, request = self.rnd.choices(self.steps, weights=self.step_weights)[0]
+    return (label,) + request()
+
+
+class Paths:
+  # anonymous round-robin over fixed paths
+  def __init__(self, number, paths):
+    self.paths = paths
+    self.i = number
+
+  def login(self):
+    return None
+
+  def next(self):
+    path = self.paths[self.i % len(self.paths)]
+    self.i += 1
+    return path, 'GET', path, None
+
+
+def run_load(base_url, clients, duration):
+  """
+  Run each client from its own thread, with its own keep-alive connection and
+  session cookie, for `duration` seconds.
+  Returns {label: {'latencies': [...], 'statements': [...], 'errors': n}}.
+  """
+  parts = urlsplit(base_url)
+  results = {}
+  lock = threading.Lock()
+  deadline = time.time() + duration
+
+  def client(browser):
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    cookie = None
+    mine = {}
+    request = browser.login() or browser.next()
+    while time.time() < deadline:
+      label, method, path, form = request
+      result = mine.setdefault(label, {'latencies': [], 'statements': [], 'errors': 0})
+      headers = {'Cookie': cookie} if cookie else {}
+      body = None
+      if form is not None:
+        body = urlencode(form, doseq=True)
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+      start = time.perf_counter()
+      try:
+        conn.request(method, path, body, headers)
+        response = conn.getresponse()
+        if response.getheader('Content-Type', '').startswith('text/event-stream'):
+          # never ends: time its first line, then drop the connection
+          response.readline()
+          conn.close()
+          conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        else:
+          response.read()
+      except (OSError, http.client.HTTPException):
+        result['errors'] += 1
+        conn.close()
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        request = browser.next()
+        continue
+      result['latencies'].append(time.perf_counter() - start)
+      if response.status >= 500:
+        result['errors'] += 1
+      statements = STATEMENTS.search(response.getheader('Server-Timing') or '')
+      if statements:
+        result['statements'].append(int(statements.group(1)))
+      set_cookie = response.getheader('Set-Cookie')
+      if set_cookie:
+        cookie = set_cookie.split(';')[0]
+      request = browser.next()
+    with lock:
+      for label, result in mine.items():
+        total = results.setdefault(label, {'latencies': [], 'statements': [], 'errors': 0})
+        total['latencies'].extend(result['latencies'])
+        total['statements'].extend(result['statements'])
+        total['errors'] += result['errors']
+
+  threads = [threading.Thread(target=client, args=(browser,)) for browser in clients]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return results
+
+
+def summarize(results, duration):
+  results = dict(results)
+  results['total'] = {'latencies': [latency for result in results.values() for latency in result['latencies']],
+                      'statements': [count for result in results.values() for count in result['statements']],
+                      'errors': sum(result['errors'] for result in results.values())}
+  summary = {}
+  for label, result in results.items():
+    latencies = result['latencies']
+    statements = result['statements']
+    summary[label] = {'requests': len(latencies), 'rps': len(latencies) / duration,
+                      'p50': percentile(latencies, 50) * 1000, 'p95': percentile(latencies, 95) * 1000,
+                      'p99': percentile(latencies, 99) * 1000,
+                      'statements': sum(statements) / len(statements) if statements else 0.0,
+                      'errors': result['errors']}
+  return summary
+
+
+def report(config, summary):
+  print(config)
+  for label in sorted(summary, key=lambda label: (label == 'total', label)):
+    row = summary[label]
+    print("  %-34s %7d req %8.1f req/s   p50 %7.1f ms   p95 %7.1f ms   p99 %7.1f ms   %5.1f stmts   errors %d" % (
+      label, row['requests'], row['rps'], row['p50'], row['p95'], row['p99'], row['statements'], row['errors']))
+
+
+def regressions(config, summary, baseline, tolerance):
+  found = []
+  for label, base in baseline.get(config, {}).items():
+    row = summary.get(label)
+    if row is None:
+      continue
+    # sub-millisecond differences are noise
+    if row['p95'] > base['p95'] * (1 + tolerance) and row['p95'] - base['p95'] > 1.0:
+      found.append("%s %s: p95 %.1f ms, baseline %.1f ms" % (config, label, row['p95'], base['p95']))
+    if row['statements'] > base['statements'] + 0.5:
+      found.append("%s %s: %.1f statements per request, baseline %.1f" % (
+        config, label, row['statements'], base['statements']))
+  return found
+
+
+@click.command()
+@click.option('--configs', default='1x4,2x4,4x4', help='Worker configurations to compare, as WORKERSxTHREADS.')
+@click.option('--url', default=None, help='Load test an already running server instead.')
+@click.option('--port', default=8199, type=int, help='Port for the servers started by this script.')
+@click.option('--streams', default=8, type=int, help='Announcement event streams per worker of those servers.')
+@click.option('--concurrency', default=32, type=int, help='Number of client threads.')
+@click.option('--duration', default=10.0, type=float, help='Seconds of load per configuration.')
+@click.option('--users', default=1000, type=int, help='Users, recipes, categories and ingredients of the seeded database.')
+@click.option('--recipes', default=10000, type=int)
+@click.option('--categories', default=20, type=int)
+@click.option('--ingredients', default=500, type=int)
+@click.option('--seed', default=4111, type=int, help='Random seed of the simulated users.')
+@click.option('--save-baseline', default=None, help='Write the results to this JSON file.')
+@click.option('--baseline', default=None, help='Fail if a route regressed compared to this JSON file.')
+@click.option('--tolerance', default=0.25, type=float, help='Allowed p95 slowdown compared to the baseline.')
+@click.argument('PATHS', nargs=-1)
+def main(configs, url, port, streams, concurrency, duration, users, recipes, categories, ingredients, seed,
+         save_baseline, baseline, tolerance, paths):
+  def clients():
+    if paths:
+      return [Paths(i, list(paths)) for i in range(concurrency)]
+    return [Browser(i, users, recipes, categories, ingredients, seed) for i in range(concurrency)]
+
+  summaries = {}
+  if url:
+    summaries[url] = summarize(run_load(url, clients(), duration), duration)
+    report(url, summaries[url])
+  else:
+    base_url = 'http://127.0.0.1:%d' % port
+    for config in configs.split(','):
+      workers, threads = config.split('x')
+      server = subprocess.Popen([sys.executable, SERVER, 'serve', '--workers', workers, '--threads', threads,
+                                 '--streams', str(streams), '127.0.0.1', str(port)],
+                                env=dict(os.environ, ANNOUNCEMENT_HEARTBEAT='1'),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+      try:
+        wait_until_up(base_url)
+        summaries[config] = summarize(run_load(base_url, clients(), duration), duration)
+        report(config, summaries[config])
+      finally:
+        server.terminate()
+        server.wait()
+
+  if save_baseline:
+    with open(save_baseline, 'w') as f:
+      json.dump(summaries, f, indent=2, sort_keys=True)
+  if baseline:
+    with open(baseline) as f:
+      baseline = json.load(f)
+    found = []
+    for config, summary in summaries.items():
+      found.extend(regressions(config, summary, baseline, tolerance))
+    for regression in found:
+      print("regression: " + regression)
+    if found:
+      sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,83 @@
+"""
+Latency of a page of /loggedin_user_all_recipes as the catalog grows:
+
+    DATABASEURI=postgresql://.../scratch python3 server.py migrate
+    DATABASEURI=postgresql://.../scratch python3 bench/pagination.py --sizes 1000,10000,100000,1000000
+
+For every size the database is refilled by bench/seed.py (with --reset, so
+use a scratch database), then the keyset query of the page is timed at the
+first page, in the middle of the listing and at its last page, next to the
+same page read with OFFSET. A keyset page costs the same at any depth and
+any catalog size; an OFFSET page reads every row before it.
+"""
+import os
+import subprocess
+import sys
+import time
+
+import click
+from sqlalchemy import create_engine, text
+
+from read_model import percentile
+
+SEED = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'seed.py')
+
+# the query of the page, as ALL_RECIPES in server.py
+COLUMNS = "SELECT r.recipe_id, r.recipe_name, r.username, r.on_date, r.instruction, r.prep_time, r.cook_time, \
+                  r.serving, r.ingredients, r.review_count, r.like_count FROM recipe_view r \
+           WHERE r.username IS NOT NULL "
+ORDER = "ORDER BY coalesce(r.on_date, '-infinity') DESC, r.recipe_id DESC "
+KEYSET = text(COLUMNS + "AND (coalesce(r.on_date, '-infinity'), r.recipe_id) < (CAST(:on_date AS date), :recipe_id) " +
+              ORDER + "LIMIT :limit")
+FIRST = text(COLUMNS + ORDER + "LIMIT :limit")
+OFFSET = text(COLUMNS + ORDER + "LIMIT :limit OFFSET :offset")
+CURSOR = text("SELECT r.on_date, r.recipe_id FROM recipe_view r \
+               WHERE r.username IS NOT NULL " + ORDER + "LIMIT 1 OFFSET :offset")
+
+
+def seed(size):
+  start = time.perf_counter()
+  subprocess.run([sys.executable, SEED, '--reset', '--recipes', str(size), '--users', str(max(size // 10, 10)),
+                  '--saves', str(size), '--reviews', str(size // 5), '--announcements', '100'],
+                 check=True, stdout=subprocess.DEVNULL)
+  return time.perf_counter() - start
+
+
+def measure(conn, query, params, runs):
+  for _ in range(min(runs, 5)):
+    conn.execute(query, params).fetchall()
+  timings = []
+  for _ in range(runs):
+    start = time.perf_counter()
+    conn.execute(query, params).fetchall()
+    timings.append(time.perf_counter() - start)
+  return timings
+
+
+@click.command()
+@click.option('--sizes', default='1000,10000,100000,1000000', help='Numbers of recipes to compare.')
+@click.option('--runs', default=50, type=int, help='Timed runs per query.')
+@click.option('--page-size', default=50, type=int, help='RECIPE_PAGE_SIZE of server.py.')
+@click.option('--no-seed', is_flag=True, help='Measure the data already loaded, for a single size.')
+def main(sizes, runs, page_size, no_seed):
+  engine = create_engine(os.environ['DATABASEURI'])
+  for size in [int(size) for size in sizes.split(',')]:
+    if not no_seed:
+      print("seeded %d recipes in %.0fs" % (size, seed(size)))
+    with engine.connect() as conn:
+      rows = conn.execute(text("SELECT count(*) FROM recipe_view WHERE username IS NOT NULL")).scalar()
+      for label, offset in [('first', 0), ('middle', rows // 2), ('last', max(rows - page_size, 0))]:
+        if offset:
+          on_date, recipe_id = conn.execute(CURSOR, {'offset': offset - 1}).one()
+          keyset, params = KEYSET, {'on_date': on_date, 'recipe_id': recipe_id, 'limit': page_size + 1}
+        else:
+          keyset, params = FIRST, {'limit': page_size + 1}
+        keyset_timings = measure(conn, keyset, params, runs)
+        offset_timings = measure(conn, OFFSET, {'limit': page_size + 1, 'offset': offset}, runs)
+        print("%8d recipes  %-6s page   keyset p50 %7.2f ms  p99 %7.2f ms   offset p50 %8.2f ms  p99 %8.2f ms" % (
+          rows, label, percentile(keyset_timings, 50) * 1000, percentile(keyset_timings, 99) * 1000,
+          percentile(offset_timings, 50) * 1000, percentile(offset_timings, 99) * 1000))
+
+
+if __name__ == '__main__':
+  main()
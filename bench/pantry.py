@@ -0,0 +1,85 @@
+"""
+The pantry query of /cook against the naive way of answering it, one query
+per recipe for its ingredients and the ranking done in python:
+
+    DATABASEURI=postgresql://... python3 bench/pantry.py --pantry 'tomato 1,garlic 2,salt 5'
+
+The pantry query is run --runs times, the naive scan once (it reads every
+recipe of the catalog, or the first --recipes of them). Both rank the
+recipes by the share of their ingredients the pantry covers, then by how
+many it covers, then by recipe_id, and the bench checks they agree.
+Without --pantry, the --size most used ingredients of bench/seed.py are used.
+"""
+import os
+import time
+
+import click
+from sqlalchemy import create_engine, text
+
+from read_model import percentile
+from seed import ingredient_name
+
+# PANTRY_RECIPES of server.py
+PANTRY = text("WITH pantry AS (SELECT DISTINCT unnest(CAST(:names AS text[])) AS name), \
+                    candidates AS (SELECT DISTINCT u.recipe_id FROM use u \
+                                   WHERE lower(u.name) IN (SELECT name FROM pantry)) \
+               SELECT r.recipe_id, count(*) AS total, count(p.name) AS covered \
+               FROM candidates c JOIN rec_upload r ON r.recipe_id = c.recipe_id \
+                    JOIN use u ON u.recipe_id = c.recipe_id \
+                    LEFT JOIN pantry p ON p.name = lower(u.name) \
+               GROUP BY r.recipe_id \
+               ORDER BY count(p.name)::float / count(*) DESC, count(p.name) DESC, r.recipe_id \
+               LIMIT :limit")
+RECIPE_IDS = text("SELECT recipe_id FROM rec_upload ORDER BY recipe_id LIMIT :recipes")
+RECIPE_INGREDIENTS = text("SELECT name FROM use WHERE recipe_id = :recipe_id")
+
+
+def naive(conn, names, limit, recipes):
+  pantry = set(names)
+  ranked = []
+  for recipe_id in conn.execute(RECIPE_IDS, {'recipes': recipes}).scalars().all():
+    ingredients = conn.execute(RECIPE_INGREDIENTS, {'recipe_id': recipe_id}).scalars().all()
+    covered = sum(1 for name in ingredients if name.lower() in pantry)
+    if covered:
+      ranked.append((-covered / len(ingredients), -covered, recipe_id))
+  ranked.sort()
+  return [recipe_id for share, covered, recipe_id in ranked[:limit]]
+
+
+@click.command()
+@click.option('--pantry', default=None, help='Comma separated ingredient names.')
+@click.option('--size', default=5, type=int, help='Number of ingredients of the default pantry.')
+@click.option('--limit', default=50, type=int, help='RECIPE_PAGE_SIZE of server.py.')
+@click.option('--runs', default=20, type=int, help='Timed runs of the pantry query.')
+@click.option('--recipes', default=None, type=int, help='Only scan the first recipes naively.')
+def main(pantry, size, limit, runs, recipes):
+  engine = create_engine(os.environ['DATABASEURI'])
+  if pantry:
+    names = sorted({name.strip().lower() for name in pantry.split(',') if name.strip()})
+  else:
+    names = [ingredient_name(rank) for rank in range(1, size + 1)]
+  with engine.connect() as conn:
+    total = conn.execute(text("SELECT count(*) FROM rec_upload")).scalar()
+    recipes = min(recipes or total, total)
+    params = {'names': names, 'limit': limit}
+    conn.execute(PANTRY, params).all()
+    timings = []
+    for _ in range(runs):
+      start = time.perf_counter()
+      ranked = [row.recipe_id for row in conn.execute(PANTRY, params)]
+      timings.append(time.perf_counter() - start)
+    print("pantry of %d ingredients, %d recipes" % (len(names), total))
+    print("pantry query   p50 %9.1f ms   p99 %9.1f ms   1 statement" % (
+      percentile(timings, 50) * 1000, percentile(timings, 99) * 1000))
+    start = time.perf_counter()
+    expected = naive(conn, names, limit, recipes)
+    elapsed = time.perf_counter() - start
+    print("naive scan     %9.1f ms for %d recipes (%d statements)%s" % (
+      elapsed * 1000, recipes, recipes + 1,
+      '' if recipes == total else ', %.1f s for the whole catalog' % (elapsed * total / recipes)))
+    if recipes == total and expected != ranked:
+      raise click.ClickException('the pantry query and the naive scan ranked the recipes differently')
+
+
+if __name__ == '__main__':
+  main()
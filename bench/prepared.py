@@ -0,0 +1,61 @@
+"""
+Per-statement overhead of the registered queries of server.py run as plain
+text() (parsed and planned by postgres on every call) and as named prepared
+statements (PREPARE once per connection, then EXECUTE):
+
+    DATABASEURI=postgresql://... python3 bench/prepared.py --runs 2000
+
+Both modes run on the same connection, after a warm-up, with the same
+parameters; the mean and p99 latencies are reported per query, with the
+planning time postgres reports for one plain run.
+"""
+import os
+import sys
+import time
+
+import click
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import server
+from read_model import percentile
+
+QUERIES = ['home_recipes', 'category_recipes', 'login', 'review_stats', 'all_recipes']
+
+
+def measure(run, runs):
+  for _ in range(min(runs, 20)):
+    run()
+  timings = []
+  for _ in range(runs):
+    start = time.perf_counter()
+    run()
+    timings.append(time.perf_counter() - start)
+  return timings
+
+
+@click.command()
+@click.option('--runs', default=2000, type=int, help='Timed runs per query and mode.')
+@click.argument('NAMES', nargs=-1)
+def main(runs, names):
+  with server.engine.connect() as conn:
+    params = dict(conn.execute(text("SELECT (SELECT user_id FROM rec_upload LIMIT 1) AS user_id, \
+                                            (SELECT cid FROM characterize LIMIT 1) AS cid, \
+                                            (SELECT username FROM users LIMIT 1) AS username, \
+                                            (SELECT recipe_id FROM review LIMIT 1) AS recipe_id")).one()._mapping)
+    params['limit'] = server.app.config['RECIPE_PAGE_SIZE'] + 1
+    for name in names or QUERIES:
+      query = server.QUERIES[name]
+      values = {param: params[param] for param in query.params}
+      plain = measure(lambda: conn.execute(text(query.sql), values).fetchall(), runs)
+      server.app.config['PREPARED_STATEMENTS'] = True
+      prepared = measure(lambda: server.run_query(query, values, conn).fetchall(), runs)
+      planning = conn.execute(text("EXPLAIN (ANALYZE, FORMAT JSON) " + query.sql), values).scalar()[0]['Planning Time']
+      print("%-18s plain mean %8.1f us p99 %8.1f us   prepared mean %8.1f us p99 %8.1f us   planning %6.3f ms" % (
+        name, sum(plain) / runs * 1e6, percentile(plain, 99) * 1e6,
+        sum(prepared) / runs * 1e6, percentile(prepared, 99) * 1e6, planning))
+    conn.rollback()
+
+
+if __name__ == '__main__':
+  main()
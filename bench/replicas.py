@@ -0,0 +1,132 @@
+"""
+Throughput of the read-only routes of server.py with 0, 1, 2 and 4 read replicas:
+
+    DATABASEURI=postgresql://... python3 bench/replicas.py --replica postgresql://...replica1 --replica ...
+
+Local streaming replicas of a primary can be made with pg_basebackup, e.g.
+
+    pg_basebackup -h /tmp/pgdata -U postgres -D /tmp/w4111-replica1 -R -X stream -c fast
+    pg_ctl -D /tmp/w4111-replica1 -o "-k /tmp/w4111-replica1" -l /tmp/w4111-replica1.log start
+    --replica 'postgresql://postgres@/postgres?host=/tmp/w4111-replica1'
+
+(any other database with the same data works as a stand-in, it only has no lag).
+For each count a server is started with the first --counts of the replicas in
+REPLICA_URIS, then every client thread logs in as its own bench/seed.py user and
+loads the @replica_reads pages (recipes, a category, its recipes, announcements,
+a recipe's reviews) for --duration seconds, saving a recipe with probability
+--writes. Reports requests/sec, latency percentiles and the share of transactions
+each database served (from pg_stat_database).
+"""
+import http.client
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+import click
+from sqlalchemy import create_engine, text
+
+from auth import login
+from loadtest import SERVER, percentile, wait_until_up
+
+TRANSACTIONS = text("SELECT xact_commit + xact_rollback FROM pg_stat_database WHERE datname = current_database()")
+
+
+def transactions(engines):
+  counts = []
+  for engine in engines:
+    with engine.connect() as conn:
+      counts.append(conn.execute(TRANSACTIONS).scalar())
+  return counts
+
+
+def read_load(base_url, concurrency, duration, writes, recipes, categories, seed):
+  parts = urlsplit(base_url)
+  latencies = []
+  errors = [0]
+  lock = threading.Lock()
+  deadline = time.time() + duration
+
+  def client(user):
+    rnd = random.Random(seed * 100003 + user)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    cookie = login(conn, user)
+    pages = [lambda: '/recipes',
+             lambda: '/category/%d/recipes' % rnd.randint(1, categories),
+             lambda: '/loggedin_user_all_recipes',
+             lambda: '/announcement',
+             lambda: '/review_page/%d' % rnd.randint(1, recipes)]
+    mine = []
+    failed = 0
+    while time.time() < deadline:
+      if rnd.random() < writes:
+        conn.request('POST', '/save_recipe/%d' % rnd.randint(1, recipes), urlencode({}),
+                     {'Cookie': cookie, 'Content-Type': 'application/x-www-form-urlencoded'})
+      else:
+        conn.request('GET', rnd.choice(pages)(), headers={'Cookie': cookie})
+      start = time.perf_counter()
+      response = conn.getresponse()
+      response.read()
+      mine.append(time.perf_counter() - start)
+      if response.status >= 400:
+        failed += 1
+      # the session cookie changes when the user writes (stickiness)
+      if response.getheader('Set-Cookie'):
+        cookie = response.getheader('Set-Cookie').split(';')[0]
+    with lock:
+      latencies.extend(mine)
+      errors[0] += failed
+
+  threads = [threading.Thread(target=client, args=(user,)) for user in range(1, concurrency + 1)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return latencies, errors[0]
+
+
+@click.command()
+@click.option('--replica', 'replica_uris', multiple=True, help='URI of a read replica, repeat for several.')
+@click.option('--counts', default='0,1,2,4', help='Numbers of replicas to compare.')
+@click.option('--strategy', default='round_robin', type=click.Choice(['round_robin', 'least_latency']))
+@click.option('--workers', default=2, type=int)
+@click.option('--threads', default=4, type=int)
+@click.option('--port', default=8199, type=int, help='Port for the servers started by this script.')
+@click.option('--concurrency', default=8, type=int, help='Number of client threads, each logs in as its own user.')
+@click.option('--duration', default=10.0, type=float, help='Seconds of requests per replica count.')
+@click.option('--writes', default=0.0, type=float, help='Share of requests that save a recipe.')
+@click.option('--seed', default=4111, type=int)
+def main(replica_uris, counts, strategy, workers, threads, port, concurrency, duration, writes, seed):
+  counts = [int(count) for count in counts.split(',')]
+  if max(counts) > len(replica_uris):
+    raise click.ClickException('%d replicas needed, %d given' % (max(counts), len(replica_uris)))
+  primary = create_engine(os.environ['DATABASEURI'])
+  engines = [primary] + [create_engine(uri) for uri in replica_uris]
+  with primary.connect() as conn:
+    recipes, categories = conn.execute(text("SELECT (SELECT max(recipe_id) FROM recipe_view), \
+                                                    (SELECT max(cid) FROM categories)")).one()
+  base_url = 'http://127.0.0.1:%d' % port
+  for count in counts:
+    env = dict(os.environ, REPLICA_URIS=','.join(replica_uris[:count]), REPLICA_STRATEGY=strategy)
+    server = subprocess.Popen([sys.executable, SERVER, 'serve', '--workers', str(workers), '--threads', str(threads),
+                               '127.0.0.1', str(port)], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+      wait_until_up(base_url)
+      before = transactions(engines[:count + 1])
+      latencies, errors = read_load(base_url, concurrency, duration, writes, recipes, categories, seed)
+      served = [after - start for start, after in zip(before, transactions(engines[:count + 1]))]
+    finally:
+      server.terminate()
+      server.wait()
+    shares = ' '.join('%.0f%%' % (100 * part / max(sum(served), 1)) for part in served)
+    print("%d replicas   %8.1f req/s   p50 %7.2f ms   p99 %7.2f ms   errors %d   primary/replicas %s" % (
+      count, len(latencies) / duration, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+      errors, shares))
+
+
+if __name__ == '__main__':
+  main()
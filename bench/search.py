@@ -0,0 +1,89 @@
+"""
+Latency of /search on a large catalog:
+
+    DATABASEURI=postgresql://... python3 bench/seed.py --recipes 1000000 --users 100000 --reset
+    DATABASEURI=postgresql://... python3 bench/search.py --runs 20
+
+Starts a server and times --runs requests of a few kinds of searches: a word
+that most seeded recipes contain, two words, a rare term (the number of an
+ingredient that few recipes use), each with and without the category and
+time filters, and the second page of results. Reports the latency
+percentiles, the DB time from the Server-Timing header and how many recipes
+contain the words (before the filters), which is what a search's cost grows with.
+"""
+import http.client
+import os
+import re
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+import click
+from sqlalchemy import create_engine, text
+
+from loadtest import SERVER, percentile, wait_until_up
+from seed import ingredient_name
+
+DB_TIME = re.compile(r'db;dur=([\d.]+)')
+NEXT_PAGE = re.compile(r'after=([^"&]+)')
+MATCHES = text("SELECT count(*) FROM rec_upload WHERE search_doc @@ websearch_to_tsquery('english', :q)")
+
+
+def timed_get(conn, path):
+  start = time.perf_counter()
+  conn.request('GET', path)
+  response = conn.getresponse()
+  body = response.read().decode()
+  elapsed = time.perf_counter() - start
+  if response.status != 200:
+    raise click.ClickException('%s answered %d' % (path, response.status))
+  return elapsed, float(DB_TIME.search(response.getheader('Server-Timing')).group(1)) / 1000, body
+
+
+@click.command()
+@click.option('--runs', default=20, type=int, help='Timed requests per search.')
+@click.option('--ingredients', default=500, type=int, help='--ingredients the catalog was seeded with.')
+@click.option('--port', default=8199, type=int, help='Port for the server started by this script.')
+def main(runs, ingredients, port):
+  engine = create_engine(os.environ['DATABASEURI'])
+  with engine.connect() as conn:
+    recipes = conn.execute(text("SELECT count(*) FROM rec_upload")).scalar()
+  rare = ingredient_name(ingredients).split()[1]
+  searches = [
+    ('common word', {'q': 'tomato'}),
+    ('common word, filtered', {'q': 'tomato', 'cid': 1, 'max_prep': 15, 'max_cook': 30}),
+    ('two words', {'q': 'garlic soup'}),
+    ('rare term', {'q': rare}),
+    ('rare term, filtered', {'q': rare, 'cid': 1, 'max_prep': 15}),
+  ]
+  server = subprocess.Popen([sys.executable, SERVER, 'serve', '--workers', '1', '--threads', '1', '127.0.0.1', str(port)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+  try:
+    wait_until_up('http://127.0.0.1:%d' % port)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=300)
+    print("%d recipes" % recipes)
+    for label, params in searches:
+      with engine.connect() as db:
+        matches = db.execute(MATCHES, params).scalar()
+      path = '/search?' + urlencode(params)
+      pages = [('', path)]
+      # the second page, from the cursor of the first one
+      first_page = timed_get(conn, path)[2]
+      cursor = NEXT_PAGE.search(first_page)
+      if cursor:
+        pages.append((' page 2', path + '&after=' + cursor.group(1)))
+      for page, page_path in pages:
+        timings = [timed_get(conn, page_path) for _ in range(runs)]
+        latencies = [elapsed for elapsed, db_time, body in timings]
+        db_times = [db_time for elapsed, db_time, body in timings]
+        print("%-30s %8d matches   p50 %8.1f ms   p99 %8.1f ms   db p50 %8.1f ms" % (
+          label + page, matches, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+          percentile(db_times, 50) * 1000))
+  finally:
+    server.terminate()
+    server.wait()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,89 @@
+"""
+Cookie size and per-request cost of each SESSION_BACKEND of server.py:
+
+    DATABASEURI=postgresql://... python3 bench/sessions.py --backends cookie,memory,sqlite,postgres
+
+For each backend a server is started (one worker for 'memory', whose
+sessions aren't shared between processes), every client thread logs in as
+its own bench/seed.py user and loads its home page, which reads the session,
+for --duration seconds. Reports the session cookie size and the home page
+latency percentiles; a client whose session isn't found gets redirected to
+the login page, which is counted as an error.
+"""
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import click
+
+from auth import login
+from loadtest import SERVER, percentile, wait_until_up
+
+
+def home_load(base_url, concurrency, duration):
+  parts = urlsplit(base_url)
+  latencies = []
+  cookies = []
+  errors = [0]
+  lock = threading.Lock()
+  deadline = time.time() + duration
+
+  def client(user):
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    cookie = login(conn, user)
+    mine = []
+    failed = 0
+    while time.time() < deadline:
+      start = time.perf_counter()
+      conn.request('GET', '/login/home', headers={'Cookie': cookie})
+      response = conn.getresponse()
+      response.read()
+      mine.append(time.perf_counter() - start)
+      if response.status != 200:
+        failed += 1
+    with lock:
+      cookies.append(len(cookie))
+      latencies.extend(mine)
+      errors[0] += failed
+
+  threads = [threading.Thread(target=client, args=(user,)) for user in range(1, concurrency + 1)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return latencies, max(cookies), errors[0]
+
+
+@click.command()
+@click.option('--backends', default='cookie,memory,sqlite,postgres', help='SESSION_BACKEND values to compare.')
+@click.option('--workers', default=2, type=int, help='Worker processes, except for the memory backend.')
+@click.option('--threads', default=4, type=int)
+@click.option('--port', default=8199, type=int, help='Port for the servers started by this script.')
+@click.option('--concurrency', default=8, type=int, help='Number of client threads, each logs in as its own user.')
+@click.option('--duration', default=10.0, type=float, help='Seconds of home page requests per backend.')
+def main(backends, workers, threads, port, concurrency, duration):
+  base_url = 'http://127.0.0.1:%d' % port
+  for backend in backends.split(','):
+    server = subprocess.Popen([sys.executable, SERVER, 'serve', '--workers', '1' if backend == 'memory' else str(workers),
+                               '--threads', str(threads), '127.0.0.1', str(port)],
+                              env=dict(os.environ, SESSION_BACKEND=backend, SESSION_PATH='/tmp/w4111-bench-sessions.sqlite3'),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+      wait_until_up(base_url)
+      latencies, cookie, errors = home_load(base_url, concurrency, duration)
+    finally:
+      server.terminate()
+      server.wait()
+    print("%-9s cookie %4d bytes   %8.1f req/s   p50 %7.2f ms   p99 %7.2f ms   errors %d" % (
+      backend, cookie, len(latencies) / duration, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000,
+      errors))
+  if os.path.exists('/tmp/w4111-bench-sessions.sqlite3'):
+    os.remove('/tmp/w4111-bench-sessions.sqlite3')
+
+
+if __name__ == '__main__':
+  main()
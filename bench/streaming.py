@@ -0,0 +1,110 @@
+"""
+Time to first byte and worker memory of a large listing page, with the
+STREAM_TEMPLATES mode of server.py off and on:
+
+    DATABASEURI=postgresql://... python3 bench/streaming.py --cid 1 --concurrency 4
+
+For each mode a server with one worker is started, then --concurrency client
+threads load the recipes of category --cid (every recipe of the category on
+one page) --requests times each. Reports the time to the first byte of the
+body, the time to the last one, the page size and the peak resident memory
+of the worker (VmHWM) above what it used before the first request.
+"""
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import click
+
+from loadtest import SERVER, percentile, wait_until_up
+
+
+def worker_pid(pid, timeout=10):
+  # the gunicorn worker forked by the master process pid
+  deadline = time.time() + timeout
+  while time.time() < deadline:
+    for entry in os.listdir('/proc'):
+      if entry.isdigit():
+        try:
+          with open('/proc/%s/stat' % entry) as stat:
+            if int(stat.read().rsplit(')', 1)[1].split()[1]) == pid:
+              return int(entry)
+        except OSError:
+          pass
+    time.sleep(0.1)
+  raise click.ClickException('no worker process found')
+
+
+def memory(pid, field):
+  # VmRSS or VmHWM of a process, in bytes
+  with open('/proc/%d/status' % pid) as status:
+    for line in status:
+      if line.startswith(field + ':'):
+        return int(line.split()[1]) * 1024
+
+
+def page_load(port, path, concurrency, requests):
+  first_bytes = []
+  totals = []
+  sizes = []
+  lock = threading.Lock()
+
+  def client():
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    mine = []
+    for _ in range(requests):
+      start = time.perf_counter()
+      conn.request('GET', path)
+      response = conn.getresponse()
+      body = response.read(1)
+      first_byte = time.perf_counter() - start
+      body += response.read()
+      mine.append((first_byte, time.perf_counter() - start, len(body)))
+    with lock:
+      for first_byte, total, size in mine:
+        first_bytes.append(first_byte)
+        totals.append(total)
+        sizes.append(size)
+
+  threads = [threading.Thread(target=client) for _ in range(concurrency)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return first_bytes, totals, max(sizes)
+
+
+@click.command()
+@click.option('--cid', default=1, type=int, help='Category whose recipes are listed.')
+@click.option('--concurrency', default=4, type=int, help='Client threads, and threads of the worker.')
+@click.option('--requests', default=5, type=int, help='Requests per client thread.')
+@click.option('--batch-size', default=100, type=int, help='STREAM_BATCH_SIZE of the streaming mode.')
+@click.option('--port', default=8199, type=int, help='Port for the servers started by this script.')
+def main(cid, concurrency, requests, batch_size, port):
+  path = '/category/%d/recipes' % cid
+  for streaming in ('0', '1'):
+    env = dict(os.environ, STREAM_TEMPLATES=streaming, STREAM_BATCH_SIZE=str(batch_size))
+    server = subprocess.Popen([sys.executable, SERVER, 'serve', '--workers', '1', '--threads', str(concurrency),
+                               '127.0.0.1', str(port)], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+      wait_until_up('http://127.0.0.1:%d' % port)
+      worker = worker_pid(server.pid)
+      before = memory(worker, 'VmRSS')
+      first_bytes, totals, size = page_load(port, path, concurrency, requests)
+      peak = memory(worker, 'VmHWM')
+    finally:
+      server.terminate()
+      server.wait()
+    print("streaming %-3s  %6.1f MB page   first byte p50 %8.1f ms  p99 %8.1f ms   "
+          "last byte p50 %8.1f ms  p99 %8.1f ms   worker peak +%6.1f MB" % (
+            'on' if streaming == '1' else 'off', size / 1e6,
+            percentile(first_bytes, 50) * 1000, percentile(first_bytes, 99) * 1000,
+            percentile(totals, 50) * 1000, percentile(totals, 99) * 1000, (peak - before) / 1e6))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,184 @@
+"""
+Write throughput of server.py with write-behind off and on.
+
+Starts the server once per mode, logs every client thread in and has them
+save recipes for a fixed time, then reports writes/sec and latency percentiles
+(and, with write-behind on, how long the queue took to drain):
+
+    DATABASEURI=postgresql://... python3 bench/writebehind.py --username alice --password pw1
+
+--crash-test instead queues announcements with the flusher held back,
+kills the server with SIGKILL, starts it again and checks that every queued
+announcement reaches postgres.
+"""
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+
+import click
+from sqlalchemy import create_engine, text
+
+from loadtest import SERVER, percentile, wait_until_up
+
+
+def start_server(port, env):
+  return subprocess.Popen([sys.executable, SERVER, 'serve', '--workers', '1', '--threads', '8', '127.0.0.1', str(port)],
+                          env=dict(os.environ, **env), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def login(port, username, password):
+  # returns the session cookie of a logged in user
+  conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+  conn.request('POST', '/login', urlencode({'username': username, 'password': password}),
+               {'Content-Type': 'application/x-www-form-urlencoded'})
+  response = conn.getresponse()
+  response.read()
+  cookie = response.getheader('Set-Cookie')
+  if response.status != 302 or not cookie:
+    raise click.ClickException('login failed for ' + username)
+  return cookie.split(';')[0]
+
+
+def post(conn, path, cookie, form=None):
+  conn.request('POST', path, urlencode(form or {}),
+               {'Content-Type': 'application/x-www-form-urlencoded', 'Cookie': cookie})
+  response = conn.getresponse()
+  response.read()
+  return response.status
+
+
+def write_load(port, cookie, recipe_ids, concurrency, duration):
+  latencies = []
+  errors = [0]
+  lock = threading.Lock()
+  deadline = time.time() + duration
+
+  def client(offset):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    mine = []
+    failed = 0
+    i = offset
+    while time.time() < deadline:
+      recipe_id = recipe_ids[i % len(recipe_ids)]
+      i += concurrency
+      start = time.perf_counter()
+      try:
+        if post(conn, '/save_recipe/%d' % recipe_id, cookie) >= 500:
+          failed += 1
+      except (OSError, http.client.HTTPException):
+        failed += 1
+        conn.close()
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        continue
+      mine.append(time.perf_counter() - start)
+    with lock:
+      latencies.extend(mine)
+      errors[0] += failed
+
+  threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return latencies, errors[0]
+
+
+def pending_writes(port):
+  conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+  token = os.environ.get('METRICS_TOKEN')
+  conn.request('GET', '/stats', headers={'Authorization': 'Bearer ' + token} if token else {})
+  writes = json.loads(conn.getresponse().read())['writes']
+  return writes['pending'] if writes else 0
+
+
+def benchmark(port, username, password, recipe_ids, concurrency, duration):
+  for mode in ('0', '1'):
+    queue = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False).name
+    server = start_server(port, {'WRITE_BEHIND': mode, 'WRITE_QUEUE_PATH': queue})
+    try:
+      wait_until_up('http://127.0.0.1:%d' % port)
+      cookie = login(port, username, password)
+      latencies, errors = write_load(port, cookie, recipe_ids, concurrency, duration)
+      start = time.perf_counter()
+      while mode == '1' and pending_writes(port):
+        time.sleep(0.05)
+      print("write-behind %-3s %8d writes %10.1f writes/s   p50 %7.1f ms   p99 %7.1f ms   errors %d   drained in %.2fs" % (
+        'on' if mode == '1' else 'off', len(latencies), len(latencies) / duration,
+        percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000, errors, time.perf_counter() - start))
+    finally:
+      server.terminate()
+      server.wait()
+      os.remove(queue)
+
+
+def run_crash_test(port, username, password, writes):
+  engine = create_engine(os.environ['DATABASEURI'])
+  tag = 'crash-test %s' % uuid.uuid4().hex
+  queue = tempfile.NamedTemporaryFile(suffix='.sqlite3', delete=False).name
+  env = {'WRITE_BEHIND': '1', 'WRITE_QUEUE_PATH': queue}
+
+  # queue the announcements without letting the flusher run
+  server = start_server(port, dict(env, WRITE_FLUSH_INTERVAL='3600'))
+  try:
+    wait_until_up('http://127.0.0.1:%d' % port)
+    cookie = login(port, username, password)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    for i in range(writes):
+      post(conn, '/user_new_announcement', cookie, {'content': '%s %d' % (tag, i), 'link': ''})
+  finally:
+    server.send_signal(signal.SIGKILL)
+    server.wait()
+
+  with engine.connect() as conn:
+    before = conn.execute(text("SELECT count(*) FROM ann_post WHERE description LIKE :tag"),
+                          {'tag': tag + ' %'}).scalar()
+  print("%d announcements posted, %d in postgres after the crash" % (writes, before))
+
+  server = start_server(port, env)
+  try:
+    wait_until_up('http://127.0.0.1:%d' % port)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+      with engine.connect() as conn:
+        after = conn.execute(text("SELECT count(*) FROM ann_post WHERE description LIKE :tag"),
+                             {'tag': tag + ' %'}).scalar()
+      if after >= writes:
+        break
+      time.sleep(0.2)
+  finally:
+    server.terminate()
+    server.wait()
+    os.remove(queue)
+  print("%d in postgres after the restart" % after)
+  if after != writes:
+    raise click.ClickException('queued writes were lost or duplicated')
+  print("ok")
+
+
+@click.command()
+@click.option('--username', required=True, help='Account the writes are made with.')
+@click.option('--password', required=True)
+@click.option('--recipes', default='1-100', help='Range of recipe ids to save, as FIRST-LAST.')
+@click.option('--port', default=8199, type=int, help='Port for the servers started by this script.')
+@click.option('--concurrency', default=16, type=int, help='Number of client threads.')
+@click.option('--duration', default=10.0, type=float, help='Seconds of load per mode.')
+@click.option('--crash-test', is_flag=True, help='Check that queued writes survive a SIGKILL instead.')
+@click.option('--writes', default=50, type=int, help='Announcements queued by the crash test.')
+def main(username, password, recipes, port, concurrency, duration, crash_test, writes):
+  if crash_test:
+    run_crash_test(port, username, password, writes)
+    return
+  first, last = recipes.split('-')
+  benchmark(port, username, password, list(range(int(first), int(last) + 1)), concurrency, duration)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,71 @@
+-- tables used by server.py, for building a fresh (e.g. local or seeded) database;
+-- a no-op on a database that already has them
+CREATE TABLE IF NOT EXISTS users (
+  user_id serial PRIMARY KEY,
+  username text UNIQUE NOT NULL,
+  password text NOT NULL,
+  user_profile text
+);
+
+CREATE TABLE IF NOT EXISTS premium_user (
+  user_id integer PRIMARY KEY REFERENCES users,
+  payment_plan text
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+  cid serial PRIMARY KEY,
+  cname text
+);
+
+CREATE TABLE IF NOT EXISTS rec_upload (
+  recipe_id serial PRIMARY KEY,
+  recipe_name text NOT NULL,
+  instruction text,
+  prep_time real,
+  cook_time real,
+  serving integer,
+  user_id integer REFERENCES users,
+  on_date date DEFAULT current_date
+);
+
+CREATE TABLE IF NOT EXISTS characterize (
+  recipe_id integer REFERENCES rec_upload,
+  cid integer REFERENCES categories,
+  PRIMARY KEY (recipe_id, cid)
+);
+
+CREATE TABLE IF NOT EXISTS ingredients (
+  name text PRIMARY KEY,
+  unit text
+);
+
+CREATE TABLE IF NOT EXISTS use (
+  recipe_id integer REFERENCES rec_upload,
+  name text REFERENCES ingredients,
+  amount real,
+  PRIMARY KEY (recipe_id, name)
+);
+
+CREATE TABLE IF NOT EXISTS saves (
+  user_id integer REFERENCES users,
+  recipe_id integer REFERENCES rec_upload,
+  on_date timestamp DEFAULT now(),
+  PRIMARY KEY (user_id, recipe_id)
+);
+
+CREATE TABLE IF NOT EXISTS review (
+  user_id integer REFERENCES users,
+  recipe_id integer REFERENCES rec_upload,
+  text text,
+  likes boolean,
+  at_time timestamp DEFAULT now(),
+  PRIMARY KEY (user_id, recipe_id)
+);
+
+CREATE TABLE IF NOT EXISTS ann_post (
+  ann_id serial PRIMARY KEY,
+  link text,
+  description text,
+  user_id integer REFERENCES users,
+  at_time timestamp DEFAULT now()
+);
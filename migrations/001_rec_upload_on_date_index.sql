@@ -0,0 +1,4 @@
+-- supports the keyset pagination of /loggedin_user_all_recipes,
+-- which orders and seeks on (on_date, recipe_id)
+CREATE INDEX IF NOT EXISTS rec_upload_on_date_recipe_id_idx
+  ON rec_upload (on_date, recipe_id);
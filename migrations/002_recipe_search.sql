@@ -0,0 +1,48 @@
+-- full text search over recipe name, instruction and ingredient names,
+-- kept in rec_upload.search_doc and indexed with GIN
+ALTER TABLE rec_upload ADD COLUMN IF NOT EXISTS search_doc tsvector;
+
+CREATE OR REPLACE FUNCTION recipe_search_doc(p_recipe_id integer, p_name text, p_instruction text)
+RETURNS tsvector AS $$
+  SELECT setweight(to_tsvector('english', coalesce(p_name, '')), 'A') ||
+         setweight(to_tsvector('english', coalesce(
+           (SELECT string_agg(u.name, ' ') FROM use u WHERE u.recipe_id = p_recipe_id), '')), 'B') ||
+         setweight(to_tsvector('english', coalesce(p_instruction, '')), 'C')
+$$ LANGUAGE sql STABLE;
+
+-- recompute when the name or instruction of a recipe changes
+CREATE OR REPLACE FUNCTION rec_upload_search_doc_trigger() RETURNS trigger AS $$
+BEGIN
+  NEW.search_doc := recipe_search_doc(NEW.recipe_id, NEW.recipe_name, NEW.instruction);
+  RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rec_upload_search_doc ON rec_upload;
+CREATE TRIGGER rec_upload_search_doc
+  BEFORE INSERT OR UPDATE OF recipe_name, instruction ON rec_upload
+  FOR EACH ROW EXECUTE FUNCTION rec_upload_search_doc_trigger();
+
+-- recompute when ingredients are added to or removed from a recipe
+CREATE OR REPLACE FUNCTION use_search_doc_trigger() RETURNS trigger AS $$
+BEGIN
+  UPDATE rec_upload r
+     SET search_doc = recipe_search_doc(r.recipe_id, r.recipe_name, r.instruction)
+   WHERE r.recipe_id IN (SELECT recipe_id FROM changed_use);
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS use_search_doc_insert ON use;
+CREATE TRIGGER use_search_doc_insert
+  AFTER INSERT ON use REFERENCING NEW TABLE AS changed_use
+  FOR EACH STATEMENT EXECUTE FUNCTION use_search_doc_trigger();
+
+DROP TRIGGER IF EXISTS use_search_doc_delete ON use;
+CREATE TRIGGER use_search_doc_delete
+  AFTER DELETE ON use REFERENCING OLD TABLE AS changed_use
+  FOR EACH STATEMENT EXECUTE FUNCTION use_search_doc_trigger();
+
+UPDATE rec_upload SET search_doc = recipe_search_doc(recipe_id, recipe_name, instruction);
+
+CREATE INDEX IF NOT EXISTS rec_upload_search_doc_idx ON rec_upload USING GIN (search_doc);
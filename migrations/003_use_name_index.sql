@@ -0,0 +1,2 @@
+-- finds the recipes using a pantry ingredient, for /cook
+CREATE INDEX IF NOT EXISTS use_lower_name_idx ON use (lower(name));
@@ -0,0 +1,66 @@
+-- per recipe review counters, kept up to date by triggers on review
+CREATE TABLE IF NOT EXISTS recipe_stats (
+  recipe_id integer PRIMARY KEY REFERENCES rec_upload ON DELETE CASCADE,
+  review_count integer NOT NULL DEFAULT 0,
+  like_count integer NOT NULL DEFAULT 0,
+  latest_review_at timestamp
+);
+
+CREATE OR REPLACE FUNCTION review_stats_insert_trigger() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO recipe_stats AS s (recipe_id, review_count, like_count, latest_review_at)
+  VALUES (NEW.recipe_id, 1, CASE WHEN NEW.likes THEN 1 ELSE 0 END, NEW.at_time)
+  ON CONFLICT (recipe_id) DO UPDATE
+    SET review_count = s.review_count + 1,
+        like_count = s.like_count + EXCLUDED.like_count,
+        latest_review_at = greatest(s.latest_review_at, EXCLUDED.latest_review_at);
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION review_stats_delete_trigger() RETURNS trigger AS $$
+BEGIN
+  UPDATE recipe_stats
+     SET review_count = review_count - 1,
+         like_count = like_count - CASE WHEN OLD.likes THEN 1 ELSE 0 END,
+         latest_review_at = (SELECT max(at_time) FROM review
+                             WHERE recipe_id = OLD.recipe_id)
+   WHERE recipe_id = OLD.recipe_id;
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION review_stats_update_trigger() RETURNS trigger AS $$
+BEGIN
+  UPDATE recipe_stats
+     SET like_count = like_count - CASE WHEN OLD.likes THEN 1 ELSE 0 END
+                                 + CASE WHEN NEW.likes THEN 1 ELSE 0 END,
+         latest_review_at = greatest(latest_review_at, NEW.at_time)
+   WHERE recipe_id = NEW.recipe_id;
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS review_stats_insert ON review;
+CREATE TRIGGER review_stats_insert AFTER INSERT ON review
+  FOR EACH ROW EXECUTE FUNCTION review_stats_insert_trigger();
+
+DROP TRIGGER IF EXISTS review_stats_delete ON review;
+CREATE TRIGGER review_stats_delete AFTER DELETE ON review
+  FOR EACH ROW EXECUTE FUNCTION review_stats_delete_trigger();
+
+DROP TRIGGER IF EXISTS review_stats_update ON review;
+CREATE TRIGGER review_stats_update AFTER UPDATE OF likes, at_time ON review
+  FOR EACH ROW EXECUTE FUNCTION review_stats_update_trigger();
+
+-- backfill from the existing reviews
+INSERT INTO recipe_stats (recipe_id, review_count, like_count, latest_review_at)
+SELECT recipe_id, count(*), count(*) FILTER (WHERE likes), max(at_time)
+FROM review GROUP BY recipe_id
+ON CONFLICT (recipe_id) DO UPDATE
+  SET review_count = EXCLUDED.review_count,
+      like_count = EXCLUDED.like_count,
+      latest_review_at = EXCLUDED.latest_review_at;
+
+-- newest reviews of a recipe first, for the keyset paging of /review_page
+CREATE INDEX IF NOT EXISTS review_recipe_id_at_time_idx ON review (recipe_id, at_time, user_id);
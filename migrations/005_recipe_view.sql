@@ -0,0 +1,163 @@
+-- denormalized read model for the recipe listings: one row per recipe with
+-- the author, category ids, formatted ingredients and review counters,
+-- kept up to date by triggers on the tables it is built from
+
+-- same output as format_ingredient() in server.py
+CREATE OR REPLACE FUNCTION format_ingredient(p_name text, p_amount real, p_unit text)
+RETURNS text AS $$
+  SELECT initcap(p_name) || ': ' ||
+         CASE WHEN p_amount IS NULL THEN 'None'
+              WHEN p_amount = trunc(p_amount) AND abs(p_amount) < 1e15 THEN trunc(p_amount)::numeric || '.0'
+              ELSE p_amount::text END ||
+         ' ' || coalesce(p_unit, 'None')
+$$ LANGUAGE sql IMMUTABLE;
+
+-- the join the read model replaces, also used to (re)build its rows
+CREATE OR REPLACE VIEW recipe_view_source AS
+SELECT r.recipe_id, r.recipe_name, r.instruction, r.prep_time, r.cook_time, r.serving,
+       r.user_id, u.username, r.on_date,
+       coalesce((SELECT array_agg(c.cid ORDER BY c.cid) FROM characterize c
+                 WHERE c.recipe_id = r.recipe_id), '{}') AS category_ids,
+       coalesce((SELECT string_agg(format_ingredient(i.name, us.amount, i.unit), '; ' ORDER BY i.name)
+                 FROM use us JOIN ingredients i ON i.name = us.name
+                 WHERE us.recipe_id = r.recipe_id), '') AS ingredients,
+       coalesce(st.review_count, 0) AS review_count,
+       coalesce(st.like_count, 0) AS like_count
+FROM rec_upload r
+LEFT JOIN users u ON u.user_id = r.user_id
+LEFT JOIN recipe_stats st ON st.recipe_id = r.recipe_id;
+
+CREATE TABLE IF NOT EXISTS recipe_view (
+  recipe_id integer PRIMARY KEY,
+  recipe_name text NOT NULL,
+  instruction text,
+  prep_time real,
+  cook_time real,
+  serving integer,
+  user_id integer,
+  username text,
+  on_date date,
+  category_ids integer[] NOT NULL DEFAULT '{}',
+  ingredients text NOT NULL DEFAULT '',
+  review_count integer NOT NULL DEFAULT 0,
+  like_count integer NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS recipe_view_on_date_idx ON recipe_view (on_date, recipe_id);
+CREATE INDEX IF NOT EXISTS recipe_view_user_id_idx ON recipe_view (user_id);
+CREATE INDEX IF NOT EXISTS recipe_view_category_ids_idx ON recipe_view USING GIN (category_ids);
+
+-- recompute the rows of some recipes, dropping the ones that no longer exist
+CREATE OR REPLACE FUNCTION refresh_recipe_view(p_recipe_ids integer[]) RETURNS void AS $$
+  DELETE FROM recipe_view WHERE recipe_id = ANY(p_recipe_ids);
+  INSERT INTO recipe_view SELECT * FROM recipe_view_source WHERE recipe_id = ANY(p_recipe_ids);
+$$ LANGUAGE sql;
+
+-- recompute every row, used by `python3 server.py rebuild-read-model`
+CREATE OR REPLACE FUNCTION rebuild_recipe_view() RETURNS void AS $$
+  DELETE FROM recipe_view;
+  INSERT INTO recipe_view SELECT * FROM recipe_view_source;
+$$ LANGUAGE sql;
+
+-- rec_upload, use and characterize: refresh the recipes touched by a statement
+CREATE OR REPLACE FUNCTION recipe_view_statement_trigger() RETURNS trigger AS $$
+BEGIN
+  PERFORM refresh_recipe_view(ARRAY(SELECT DISTINCT recipe_id FROM changed_rows));
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION recipe_view_row_trigger() RETURNS trigger AS $$
+BEGIN
+  PERFORM refresh_recipe_view(ARRAY[OLD.recipe_id, NEW.recipe_id]);
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS recipe_view_insert ON rec_upload;
+CREATE TRIGGER recipe_view_insert
+  AFTER INSERT ON rec_upload REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION recipe_view_statement_trigger();
+
+DROP TRIGGER IF EXISTS recipe_view_delete ON rec_upload;
+CREATE TRIGGER recipe_view_delete
+  AFTER DELETE ON rec_upload REFERENCING OLD TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION recipe_view_statement_trigger();
+
+-- search_doc updates are left out, they don't change the read model
+DROP TRIGGER IF EXISTS recipe_view_update ON rec_upload;
+CREATE TRIGGER recipe_view_update
+  AFTER UPDATE OF recipe_id, recipe_name, instruction, prep_time, cook_time, serving, user_id, on_date ON rec_upload
+  FOR EACH ROW EXECUTE FUNCTION recipe_view_row_trigger();
+
+DROP TRIGGER IF EXISTS recipe_view_use_insert ON use;
+CREATE TRIGGER recipe_view_use_insert
+  AFTER INSERT ON use REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION recipe_view_statement_trigger();
+
+DROP TRIGGER IF EXISTS recipe_view_use_delete ON use;
+CREATE TRIGGER recipe_view_use_delete
+  AFTER DELETE ON use REFERENCING OLD TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION recipe_view_statement_trigger();
+
+DROP TRIGGER IF EXISTS recipe_view_use_update ON use;
+CREATE TRIGGER recipe_view_use_update
+  AFTER UPDATE ON use
+  FOR EACH ROW EXECUTE FUNCTION recipe_view_row_trigger();
+
+DROP TRIGGER IF EXISTS recipe_view_characterize_insert ON characterize;
+CREATE TRIGGER recipe_view_characterize_insert
+  AFTER INSERT ON characterize REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION recipe_view_statement_trigger();
+
+DROP TRIGGER IF EXISTS recipe_view_characterize_delete ON characterize;
+CREATE TRIGGER recipe_view_characterize_delete
+  AFTER DELETE ON characterize REFERENCING OLD TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION recipe_view_statement_trigger();
+
+DROP TRIGGER IF EXISTS recipe_view_characterize_update ON characterize;
+CREATE TRIGGER recipe_view_characterize_update
+  AFTER UPDATE ON characterize
+  FOR EACH ROW EXECUTE FUNCTION recipe_view_row_trigger();
+
+-- review counters only touch their two columns
+CREATE OR REPLACE FUNCTION recipe_view_stats_trigger() RETURNS trigger AS $$
+BEGIN
+  UPDATE recipe_view
+     SET review_count = NEW.review_count, like_count = NEW.like_count
+   WHERE recipe_id = NEW.recipe_id;
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS recipe_view_stats ON recipe_stats;
+CREATE TRIGGER recipe_view_stats
+  AFTER INSERT OR UPDATE OF review_count, like_count ON recipe_stats
+  FOR EACH ROW EXECUTE FUNCTION recipe_view_stats_trigger();
+
+-- renamed users and changed ingredient units
+CREATE OR REPLACE FUNCTION recipe_view_username_trigger() RETURNS trigger AS $$
+BEGIN
+  UPDATE recipe_view SET username = NEW.username WHERE user_id = NEW.user_id;
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS recipe_view_username ON users;
+CREATE TRIGGER recipe_view_username
+  AFTER UPDATE OF username ON users
+  FOR EACH ROW EXECUTE FUNCTION recipe_view_username_trigger();
+
+CREATE OR REPLACE FUNCTION recipe_view_ingredient_trigger() RETURNS trigger AS $$
+BEGIN
+  PERFORM refresh_recipe_view(ARRAY(SELECT recipe_id FROM use WHERE name IN (OLD.name, NEW.name)));
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS recipe_view_ingredient ON ingredients;
+CREATE TRIGGER recipe_view_ingredient
+  AFTER UPDATE OF name, unit ON ingredients
+  FOR EACH ROW EXECUTE FUNCTION recipe_view_ingredient_trigger();
+
+SELECT rebuild_recipe_view();
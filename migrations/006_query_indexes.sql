@@ -0,0 +1,15 @@
+-- indexes behind the filters of server.py that no earlier migration declares;
+-- use(recipe_id) and saves(user_id, recipe_id) are the leading columns of their
+-- primary keys, and review(recipe_id, at_time) comes with 004_recipe_stats.sql
+
+-- home page and recipe_view refreshes of a user's recipes
+CREATE INDEX IF NOT EXISTS rec_upload_user_id_idx ON rec_upload (user_id);
+
+-- recipes of a category
+CREATE INDEX IF NOT EXISTS characterize_cid_idx ON characterize (cid, recipe_id);
+
+-- a user's saved recipes, newest first
+CREATE INDEX IF NOT EXISTS saves_user_id_on_date_idx ON saves (user_id, on_date);
+
+-- latest announcements
+CREATE INDEX IF NOT EXISTS ann_post_at_time_idx ON ann_post (at_time, user_id);
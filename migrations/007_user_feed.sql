@@ -0,0 +1,135 @@
+-- precomputed "recommended for you" lists of the home page, built by
+-- build_feeds() in server.py and read with one primary key lookup
+
+CREATE TABLE IF NOT EXISTS user_feed (
+  user_id integer PRIMARY KEY REFERENCES users ON DELETE CASCADE,
+  -- best first
+  recipe_ids integer[] NOT NULL DEFAULT '{}',
+  built_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS user_feed_built_at_idx ON user_feed (built_at);
+
+-- users whose saves or likes changed since their feed was built
+CREATE TABLE IF NOT EXISTS user_feed_stale (
+  user_id integer PRIMARY KEY,
+  since timestamptz NOT NULL DEFAULT now()
+);
+
+-- latest savers of a recipe
+CREATE INDEX IF NOT EXISTS saves_recipe_id_on_date_idx ON saves (recipe_id, on_date);
+
+-- The recommendations of one user, best first:
+--  * co-saves and co-likes: the users who most often saved or liked the same
+--    recipes as the user's latest p_history saves and likes are its
+--    neighbours, and their own latest saves and likes score by how much they
+--    overlap with the user
+--  * category affinity: every candidate gets a bonus for the share of the
+--    user's history in its categories, and the newest recipes of the user's
+--    three favourite categories are candidates too
+-- Popular recipes only look at their latest p_neighbours savers and likers,
+-- so the cost per user is bounded however skewed the data is.
+-- Recipes the user wrote, saved or reviewed are left out.
+CREATE OR REPLACE FUNCTION user_feed_recipes(p_user_id integer, p_size integer,
+                                             p_history integer, p_neighbours integer)
+RETURNS integer[] AS $$
+  WITH history AS (
+    SELECT recipe_id FROM (
+      (SELECT recipe_id, on_date AS at_time FROM saves
+       WHERE user_id = p_user_id ORDER BY on_date DESC LIMIT p_history)
+      UNION ALL
+      (SELECT recipe_id, at_time FROM review
+       WHERE user_id = p_user_id AND likes ORDER BY at_time DESC LIMIT p_history)
+    ) h
+    GROUP BY recipe_id ORDER BY max(at_time) DESC LIMIT p_history
+  ),
+  neighbours AS (
+    SELECT n.user_id, count(*) AS overlap
+    FROM history h
+    CROSS JOIN LATERAL (
+      (SELECT s.user_id FROM saves s
+       WHERE s.recipe_id = h.recipe_id ORDER BY s.on_date DESC LIMIT p_neighbours)
+      UNION
+      (SELECT r.user_id FROM review r
+       WHERE r.recipe_id = h.recipe_id AND r.likes ORDER BY r.at_time DESC LIMIT p_neighbours)
+    ) n
+    WHERE n.user_id <> p_user_id
+    GROUP BY n.user_id ORDER BY overlap DESC, n.user_id LIMIT p_neighbours
+  ),
+  co AS (
+    SELECT c.recipe_id, sum(n.overlap) AS score
+    FROM neighbours n
+    CROSS JOIN LATERAL (
+      (SELECT s.recipe_id FROM saves s
+       WHERE s.user_id = n.user_id ORDER BY s.on_date DESC LIMIT p_history)
+      UNION
+      (SELECT r.recipe_id FROM review r
+       WHERE r.user_id = n.user_id AND r.likes ORDER BY r.at_time DESC LIMIT p_history)
+    ) c
+    GROUP BY c.recipe_id
+  ),
+  affinity AS (
+    SELECT c.cid, count(*)::real / (SELECT count(*) FROM history) AS share
+    FROM history h JOIN characterize c ON c.recipe_id = h.recipe_id
+    GROUP BY c.cid
+  ),
+  newest AS (
+    SELECT p.recipe_id
+    FROM (SELECT cid FROM affinity ORDER BY share DESC, cid LIMIT 3) a
+    CROSS JOIN LATERAL (SELECT c.recipe_id FROM characterize c
+                        WHERE c.cid = a.cid ORDER BY c.recipe_id DESC LIMIT p_size * 2) p
+  ),
+  candidates AS (
+    SELECT recipe_id, max(score) AS score
+    FROM (SELECT recipe_id, score FROM co UNION ALL SELECT recipe_id, 0 FROM newest) c
+    GROUP BY recipe_id
+  ),
+  ranked AS (
+    SELECT c.recipe_id, v.like_count,
+           c.score / greatest((SELECT max(score) FROM co), 1)
+           + 0.5 * coalesce((SELECT max(a.share) FROM affinity a WHERE a.cid = ANY(v.category_ids)), 0) AS score
+    FROM candidates c JOIN recipe_view v ON v.recipe_id = c.recipe_id
+    WHERE v.user_id IS DISTINCT FROM p_user_id
+      AND NOT EXISTS (SELECT 1 FROM saves s WHERE s.user_id = p_user_id AND s.recipe_id = c.recipe_id)
+      AND NOT EXISTS (SELECT 1 FROM review r WHERE r.user_id = p_user_id AND r.recipe_id = c.recipe_id)
+    ORDER BY score DESC, v.like_count DESC, c.recipe_id DESC
+    LIMIT p_size
+  )
+  SELECT coalesce(array_agg(recipe_id ORDER BY score DESC, like_count DESC, recipe_id DESC), '{}')
+  FROM ranked
+$$ LANGUAGE sql STABLE;
+
+-- saves and reviews mark their users' feeds as stale
+CREATE OR REPLACE FUNCTION user_feed_stale_trigger() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO user_feed_stale (user_id)
+  SELECT DISTINCT user_id FROM changed_rows WHERE user_id IS NOT NULL
+  ON CONFLICT DO NOTHING;
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_feed_saves_insert ON saves;
+CREATE TRIGGER user_feed_saves_insert
+  AFTER INSERT ON saves REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION user_feed_stale_trigger();
+
+DROP TRIGGER IF EXISTS user_feed_saves_delete ON saves;
+CREATE TRIGGER user_feed_saves_delete
+  AFTER DELETE ON saves REFERENCING OLD TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION user_feed_stale_trigger();
+
+DROP TRIGGER IF EXISTS user_feed_review_insert ON review;
+CREATE TRIGGER user_feed_review_insert
+  AFTER INSERT ON review REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION user_feed_stale_trigger();
+
+DROP TRIGGER IF EXISTS user_feed_review_update ON review;
+CREATE TRIGGER user_feed_review_update
+  AFTER UPDATE ON review REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION user_feed_stale_trigger();
+
+DROP TRIGGER IF EXISTS user_feed_review_delete ON review;
+CREATE TRIGGER user_feed_review_delete
+  AFTER DELETE ON review REFERENCING OLD TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION user_feed_stale_trigger();
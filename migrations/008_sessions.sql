@@ -0,0 +1,12 @@
+-- server-side sessions of SESSION_BACKEND=postgres, shared by every worker and host;
+-- only the session id travels in the cookie
+
+CREATE TABLE IF NOT EXISTS sessions (
+  sid text PRIMARY KEY,
+  -- the pickled session dict
+  data bytea NOT NULL,
+  expires_at timestamptz NOT NULL
+);
+
+-- expired sessions are deleted by the background collector
+CREATE INDEX IF NOT EXISTS sessions_expires_at_idx ON sessions (expires_at);
@@ -0,0 +1,18 @@
+-- new announcements are announced on the 'announcements' channel, so every worker
+-- LISTENing on it (see listen_for_announcements() in server.py) adds them to its
+-- in-memory feed; the payload is the comma separated ann_ids of the new posts
+
+CREATE OR REPLACE FUNCTION ann_post_notify_trigger() RETURNS trigger AS $$
+BEGIN
+  -- a notification payload is limited to 8000 bytes, ids are sent 1000 at a time
+  PERFORM pg_notify('announcements', string_agg(ann_id::text, ','))
+  FROM (SELECT ann_id, (row_number() OVER () - 1) / 1000 AS chunk FROM new_posts) p
+  GROUP BY chunk;
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ann_post_notify ON ann_post;
+CREATE TRIGGER ann_post_notify
+  AFTER INSERT ON ann_post REFERENCING NEW TABLE AS new_posts
+  FOR EACH STATEMENT EXECUTE FUNCTION ann_post_notify_trigger();
@@ -0,0 +1,9 @@
+-- a version per recipe_view row, new every time refresh_recipe_view() or
+-- rebuild_recipe_view() recomputes the row (they insert it without this column,
+-- so it takes its default); rendered recipe cards are cached under
+-- (recipe_id, version), see render_recipe_cards() in server.py. The counters
+-- and the username, which cards don't show, are updated in place and keep it.
+
+CREATE SEQUENCE IF NOT EXISTS recipe_view_version_seq;
+
+ALTER TABLE recipe_view ADD COLUMN IF NOT EXISTS version bigint NOT NULL DEFAULT nextval('recipe_view_version_seq');
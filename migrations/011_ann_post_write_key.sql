@@ -0,0 +1,11 @@
+-- an announcement queued by write-behind carries a key made when it was queued
+-- (see user_write() in server.py), so a batch replayed after a crash inserts each
+-- of its announcements once, with ON CONFLICT DO NOTHING like saves and reviews;
+-- announcements written directly have no key
+
+-- an earlier version of this migration made author and time unique, which also
+-- merged distinct posts made at the same time
+DROP INDEX IF EXISTS ann_post_user_id_at_time_key;
+
+ALTER TABLE ann_post ADD COLUMN IF NOT EXISTS write_key text;
+CREATE UNIQUE INDEX IF NOT EXISTS ann_post_write_key_key ON ann_post (write_key);
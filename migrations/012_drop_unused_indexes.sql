@@ -0,0 +1,6 @@
+-- since the listings read recipe_view (005_recipe_view.sql) nothing seeks rec_upload
+-- by date or by author: recipe_view_on_date_idx and recipe_view_user_id_idx serve
+-- the all recipes and home pages. characterize_cid_idx stays, the newest recipes
+-- of a category are the candidates of user_feed_recipes() (007_user_feed.sql)
+DROP INDEX IF EXISTS rec_upload_on_date_recipe_id_idx;
+DROP INDEX IF EXISTS rec_upload_user_id_idx;
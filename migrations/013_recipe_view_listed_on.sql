@@ -0,0 +1,6 @@
+-- the all recipes page lists recipes without a date after the dated ones, sorted
+-- and paged on coalesce(on_date, '-infinity') (see ALL_RECIPES in server.py);
+-- the plain on_date index can't serve that order
+CREATE INDEX IF NOT EXISTS recipe_view_listed_on_idx
+  ON recipe_view ((coalesce(on_date, '-infinity'::date)), recipe_id);
+DROP INDEX IF EXISTS recipe_view_on_date_idx;
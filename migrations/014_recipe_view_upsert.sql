@@ -0,0 +1,36 @@
+-- refresh_recipe_view() and rebuild_recipe_view() deleted the rows and inserted
+-- them again, so two transactions refreshing the same recipe both got past the
+-- delete and the second insert failed on the primary key. Rows of recipes that
+-- still exist are now upserted in place, with a new version (see 010).
+
+CREATE OR REPLACE FUNCTION refresh_recipe_view(p_recipe_ids integer[]) RETURNS void AS $$
+  DELETE FROM recipe_view v
+   WHERE v.recipe_id = ANY(p_recipe_ids)
+     AND NOT EXISTS (SELECT 1 FROM rec_upload r WHERE r.recipe_id = v.recipe_id);
+  INSERT INTO recipe_view (recipe_id, recipe_name, instruction, prep_time, cook_time, serving, user_id, username,
+                           on_date, category_ids, ingredients, review_count, like_count)
+  SELECT recipe_id, recipe_name, instruction, prep_time, cook_time, serving, user_id, username,
+         on_date, category_ids, ingredients, review_count, like_count
+  FROM recipe_view_source WHERE recipe_id = ANY(p_recipe_ids)
+  ON CONFLICT (recipe_id) DO UPDATE
+    SET recipe_name = EXCLUDED.recipe_name, instruction = EXCLUDED.instruction, prep_time = EXCLUDED.prep_time,
+        cook_time = EXCLUDED.cook_time, serving = EXCLUDED.serving, user_id = EXCLUDED.user_id,
+        username = EXCLUDED.username, on_date = EXCLUDED.on_date, category_ids = EXCLUDED.category_ids,
+        ingredients = EXCLUDED.ingredients, review_count = EXCLUDED.review_count,
+        like_count = EXCLUDED.like_count, version = nextval('recipe_view_version_seq');
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION rebuild_recipe_view() RETURNS void AS $$
+  DELETE FROM recipe_view v WHERE NOT EXISTS (SELECT 1 FROM rec_upload r WHERE r.recipe_id = v.recipe_id);
+  INSERT INTO recipe_view (recipe_id, recipe_name, instruction, prep_time, cook_time, serving, user_id, username,
+                           on_date, category_ids, ingredients, review_count, like_count)
+  SELECT recipe_id, recipe_name, instruction, prep_time, cook_time, serving, user_id, username,
+         on_date, category_ids, ingredients, review_count, like_count
+  FROM recipe_view_source
+  ON CONFLICT (recipe_id) DO UPDATE
+    SET recipe_name = EXCLUDED.recipe_name, instruction = EXCLUDED.instruction, prep_time = EXCLUDED.prep_time,
+        cook_time = EXCLUDED.cook_time, serving = EXCLUDED.serving, user_id = EXCLUDED.user_id,
+        username = EXCLUDED.username, on_date = EXCLUDED.on_date, category_ids = EXCLUDED.category_ids,
+        ingredients = EXCLUDED.ingredients, review_count = EXCLUDED.review_count,
+        like_count = EXCLUDED.like_count, version = nextval('recipe_view_version_seq');
+$$ LANGUAGE sql;
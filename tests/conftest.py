@@ -0,0 +1,120 @@
+"""
+Fixtures of the tests of server.py:
+
+    TEST_DATABASEURI=postgresql://.../w4111_test python3 -m pytest tests
+
+Tests that need postgres are skipped when TEST_DATABASEURI isn't set. The
+database it names is emptied and migrated at the start of the run and its
+tables are truncated after every test, don't point it at data you want to keep.
+"""
+import contextlib
+import os
+import re
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import event, text
+
+# server.py reads its settings from the environment when it is imported
+TEST_DATABASEURI = os.environ.get('TEST_DATABASEURI')
+if TEST_DATABASEURI:
+  os.environ['DATABASEURI'] = TEST_DATABASEURI
+# no background listener, the tests load the announcements themselves
+os.environ['ANNOUNCEMENT_FEED'] = '0'
+# page versions of their own, not those of a server running on this host
+os.environ['VERSION_PATH'] = os.path.join(tempfile.mkdtemp(), 'versions.sqlite3')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import server  # noqa: E402
+
+STATEMENTS = re.compile(r'desc="(\d+) statements"')
+TABLES = ['user_feed_stale', 'user_feed', 'recipe_view', 'recipe_stats', 'ann_post', 'review', 'saves', 'use',
+          'characterize', 'ingredients', 'rec_upload', 'premium_user', 'categories', 'users']
+
+
+def statements(response):
+  # number of DB statements the request ran, from its Server-Timing header
+  return int(STATEMENTS.search(response.headers['Server-Timing']).group(1))
+
+
+@contextlib.contextmanager
+def counted_statements(engine):
+  # statements run on engine inside the block, including the ones of a streamed body
+  counted = []
+  def count(conn, cursor, statement, parameters, context, executemany):
+    counted.append(statement)
+  event.listen(engine, 'after_cursor_execute', count)
+  try:
+    yield counted
+  finally:
+    event.remove(engine, 'after_cursor_execute', count)
+
+
+@pytest.fixture
+def client():
+  server.app.config.update(TESTING=True)
+  server.cache.data.clear()
+  server.version_store.db().execute("DELETE FROM cache")
+  server.fragment_cache.data.clear()
+  server.fragment_cache.bytes = 0
+  return server.app.test_client()
+
+
+@pytest.fixture
+def unprepared(monkeypatch):
+  # statement counting tests: a PREPARE is counted the first time a pooled connection runs a query
+  monkeypatch.setitem(server.app.config, 'PREPARED_STATEMENTS', False)
+
+
+@pytest.fixture(scope='session')
+def database():
+  if not TEST_DATABASEURI:
+    pytest.skip('TEST_DATABASEURI is not set')
+  with server.engine.begin() as conn:
+    conn.execute(text("DROP SCHEMA public CASCADE"))
+    conn.execute(text("CREATE SCHEMA public"))
+  server.migrate()
+  return server.engine
+
+
+@pytest.fixture
+def db(database):
+  yield database
+  with database.begin() as conn:
+    conn.execute(text("TRUNCATE %s RESTART IDENTITY CASCADE" % ', '.join(TABLES)))
+
+
+def log_in(client, user_id, username='cook'):
+  # what login() keeps in the session
+  with client.session_transaction() as session:
+    session.update(loggedin=True, username=username, user_id=user_id, profile='', membership_level='Free')
+
+
+def add_recipes(db, user_id, count, cid=None, ingredients=('salt', 'flour')):
+  # count recipes of user_id in category cid, each with the given ingredients
+  with db.begin() as conn:
+    conn.execute(text("INSERT INTO ingredients (name, unit) SELECT name, 'g' FROM unnest(CAST(:names AS text[])) name \
+                       ON CONFLICT (name) DO NOTHING"), {'names': list(ingredients)})
+    recipe_ids = conn.execute(text("INSERT INTO rec_upload (recipe_name, instruction, prep_time, cook_time, serving, \
+                                                            user_id, on_date) \
+                                    SELECT 'recipe ' || i, 'mix', 5, 10, 2, :user_id, current_date - i \
+                                    FROM generate_series(1, :count) i RETURNING recipe_id"),
+                              {'user_id': user_id, 'count': count}).scalars().all()
+    conn.execute(text("INSERT INTO use (recipe_id, name, amount) \
+                       SELECT r, n, 1 FROM unnest(CAST(:recipe_ids AS integer[])) r, unnest(CAST(:names AS text[])) n"),
+                 {'recipe_ids': recipe_ids, 'names': list(ingredients)})
+    if cid is not None:
+      conn.execute(text("INSERT INTO characterize (recipe_id, cid) SELECT r, :cid FROM unnest(CAST(:recipe_ids AS integer[])) r"),
+                   {'recipe_ids': recipe_ids, 'cid': cid})
+  return recipe_ids
+
+
+@pytest.fixture
+def cook(db):
+  # a user and a category to add recipes to
+  with db.begin() as conn:
+    user_id = conn.execute(text("INSERT INTO users (username, password, user_profile) VALUES ('cook', 'pw', '') \
+                                 RETURNING user_id")).scalar()
+    cid = conn.execute(text("INSERT INTO categories (cname) VALUES ('Soups') RETURNING cid")).scalar()
+  return user_id, cid
@@ -0,0 +1,29 @@
+"""
+The in-memory announcement feed: event stream slots and new posts of this worker.
+"""
+import server
+from conftest import log_in
+
+
+def test_stream_slots_are_given_back(client, monkeypatch):
+  monkeypatch.setitem(server.app.config, 'ANNOUNCEMENT_STREAMS', 1)
+  monkeypatch.setattr(server, 'announcement_feed', server.AnnouncementFeed(10))
+  server.announcement_feed.ready.set()
+  log_in(client, 1)
+  # neither body is ever read
+  for method in ('HEAD', 'GET'):
+    response = client.open('/announcement/stream', method=method, buffered=False)
+    assert response.status_code == 200
+    assert server.announcement_feed.streams == 1
+    response.close()
+    assert server.announcement_feed.streams == 0
+
+
+def test_new_announcement_is_in_the_feed(client, cook, monkeypatch):
+  user_id, cid = cook
+  monkeypatch.setattr(server, 'announcement_feed', server.AnnouncementFeed(10))
+  server.announcement_feed.ready.set()
+  log_in(client, user_id)
+  client.post('/user_new_announcement', data={'link': 'https://example.com', 'content': 'bake sale'})
+  # without a listener to be notified
+  assert [post['description'] for post in server.announcement_feed.recent(10)] == ['bake sale']
@@ -0,0 +1,18 @@
+"""
+The sqlite cache, also the store of SESSION_BACKEND=sqlite, stays bounded by maxsize.
+"""
+import server
+
+
+def test_sqlite_cache_trim(tmp_path):
+  cache = server.SQLiteCache(str(tmp_path / 'cache.sqlite3'), maxsize=32, ttl=60)
+  for number in range(200):
+    cache.set('key:%d' % number, number)
+  # trimmed every maxsize/16 writes, keeping the entries that expire last
+  assert cache.stats()['size'] <= 32 + cache.trim_every
+  assert cache.get('key:199') == 199
+  assert cache.get('key:0') is None
+  cache.set('expired', 1, ttl=-1)
+  assert cache.trim() >= 1
+  assert cache.get('expired') is None
+  assert cache.stats()['size'] <= 32
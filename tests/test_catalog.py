@@ -0,0 +1,41 @@
+"""
+A catalog exported from one database imports into another, whose users and
+categories have other ids.
+"""
+from sqlalchemy import text
+
+import server
+from conftest import TABLES, add_recipes
+
+IMPORTED = text("SELECT r.recipe_name, u.username, c.cname \
+                 FROM rec_upload r LEFT JOIN users u ON u.user_id = r.user_id \
+                 LEFT JOIN characterize ch ON ch.recipe_id = r.recipe_id \
+                 LEFT JOIN categories c ON c.cid = ch.cid \
+                 ORDER BY r.recipe_name")
+
+
+def another_database(db, usernames, categories):
+  with db.begin() as conn:
+    conn.execute(text("TRUNCATE %s RESTART IDENTITY CASCADE" % ', '.join(TABLES)))
+    for username in usernames:
+      conn.execute(text("INSERT INTO users (username, password) VALUES (:username, 'pw')"), {'username': username})
+    for cname in categories:
+      conn.execute(text("INSERT INTO categories (cname) VALUES (:cname)"), {'cname': cname})
+
+
+def test_import_into_another_database(cook, db, tmp_path):
+  user_id, cid = cook
+  add_recipes(db, user_id, 2, cid)
+  server.export_catalog(str(tmp_path))
+
+  # the author and the category exist under other ids
+  another_database(db, ['baker', 'cook'], ['Cakes', 'Soups'])
+  server.import_catalog(str(tmp_path))
+  with db.connect() as conn:
+    assert conn.execute(IMPORTED).all() == [('recipe 1', 'cook', 'Soups'), ('recipe 2', 'cook', 'Soups')]
+
+  # neither exists: the category is created, the recipes have no author
+  another_database(db, ['baker'], [])
+  server.import_catalog(str(tmp_path))
+  with db.connect() as conn:
+    assert conn.execute(IMPORTED).all() == [('recipe 1', None, 'Soups'), ('recipe 2', None, 'Soups')]
@@ -0,0 +1,56 @@
+"""
+Conditional GETs are answered with 304 before the view runs, so without a query.
+"""
+import server
+from conftest import add_recipes, statements
+
+
+def test_categories_not_modified(client):
+  # categories come from the cache, the page needs no database at all
+  server.cache.set('categories', [(1, 'Soups'), (2, 'Cakes')])
+  response = client.get('/categories')
+  assert response.status_code == 200
+  assert 'Soups' in response.get_data(as_text=True)
+  etag = response.headers['ETag']
+
+  response = client.get('/categories', headers={'If-None-Match': etag})
+  assert response.status_code == 304
+  assert response.headers['ETag'] == etag
+  assert statements(response) == 0
+
+  server.bump_version('categories')
+  response = client.get('/categories', headers={'If-None-Match': etag})
+  assert response.status_code == 200
+  assert response.headers['ETag'] != etag
+
+
+def test_recipes_not_modified(client, cook, db, monkeypatch):
+  monkeypatch.setitem(server.app.config, 'PREPARED_STATEMENTS', False)
+  add_recipes(db, cook[0], 3)
+  response = client.get('/recipes')
+  assert response.status_code == 200
+  assert statements(response) == 1
+  etag = response.headers['ETag']
+
+  response = client.get('/recipes', headers={'If-None-Match': etag})
+  assert response.status_code == 304
+  assert statements(response) == 0
+
+  # a new recipe bumps the version of the page
+  client.post('/add_recipe', data={'name': 'stew', 'instruction': 'simmer', 'prep_time': '5',
+                                   'cook_time': '60', 'serving': '4'})
+  response = client.get('/recipes', headers={'If-None-Match': etag})
+  assert response.status_code == 200
+  assert statements(response) == 1
+
+
+def test_versions_are_shared_by_workers(client, monkeypatch):
+  server.cache.set('categories', [(1, 'Soups')])
+  etag = client.get('/categories').headers['ETag']
+  # a write on another worker, with connections of its own to the versions file
+  other_worker = server.SQLiteCache(server.app.config['VERSION_PATH'])
+  with monkeypatch.context() as patch:
+    patch.setattr(server, 'version_store', other_worker)
+    server.bump_version('categories')
+  response = client.get('/categories', headers={'If-None-Match': etag})
+  assert response.status_code == 200
@@ -0,0 +1,65 @@
+"""
+The statements behind the pages are served by the indexes of the migrations.
+Plans are checked with sequential scans disabled, as advise_indexes() does:
+the tables of the tests are too small for the planner to prefer an index.
+"""
+import datetime
+
+import pytest
+from sqlalchemy import text
+
+import server
+from conftest import add_recipes
+
+# (what, registered statement, index it must use)
+PLANS = [
+  ('all recipes', server.ALL_RECIPES[None].sql, 'recipe_view_listed_on_idx'),
+  ('all recipes next page', server.ALL_RECIPES['after'].sql, 'recipe_view_listed_on_idx'),
+  ('all recipes previous page', server.ALL_RECIPES['before'].sql, 'recipe_view_listed_on_idx'),
+  ('home recipes', server.HOME_RECIPES.sql, 'recipe_view_user_id_idx'),
+  ('category recipes', server.CATEGORY_RECIPES.sql, 'recipe_view_category_ids_idx'),
+  ('search', server.SEARCH_QUERIES[()].sql, 'rec_upload_search_doc_idx'),
+  ('pantry', server.PANTRY_RECIPES.sql, 'use_lower_name_idx'),
+  ('saved recipes', server.SAVED_RECIPES.sql, 'saves_user_id_on_date_idx'),
+  ('announcements', server.ANNOUNCEMENTS.sql, 'ann_post_at_time_idx'),
+]
+
+
+@pytest.fixture
+def catalog(cook, db):
+  user_id, cid = cook
+  recipe_ids = add_recipes(db, user_id, 200, cid, ingredients=('salt', 'flour', 'tomato'))
+  with db.begin() as conn:
+    conn.execute(text("INSERT INTO saves (user_id, recipe_id, on_date) \
+                       SELECT :user_id, r, now() - r * interval '1 hour' FROM unnest(CAST(:recipe_ids AS integer[])) r"),
+                 {'user_id': user_id, 'recipe_ids': recipe_ids})
+    conn.execute(text("INSERT INTO ann_post (link, description, user_id, at_time) \
+                       SELECT 'https://example.com', 'post ' || i, :user_id, now() - i * interval '1 minute' \
+                       FROM generate_series(1, 200) i"), {'user_id': user_id})
+    conn.execute(text("ANALYZE"))
+  return {'user_id': user_id, 'cid': cid, 'q': 'recipe', 'names': ['tomato', 'salt'], 'limit': 51,
+          'on_date': datetime.date.today(), 'recipe_id': recipe_ids[100]}
+
+
+def index_scans(plan):
+  # names of the indexes read anywhere in a plan
+  names = set()
+  nodes = [plan]
+  while nodes:
+    node = nodes.pop()
+    nodes.extend(node.get('Plans', []))
+    if 'Index Name' in node:
+      names.add(node['Index Name'])
+  return names
+
+
+@pytest.mark.parametrize('what, statement, index', PLANS, ids=[plan[0] for plan in PLANS])
+def test_index_scan(catalog, db, what, statement, index):
+  with db.connect() as conn:
+    conn.execute(text("SET enable_seqscan = off"))
+    plan = conn.execute(text("EXPLAIN (FORMAT JSON) " + statement), catalog).scalar()[0]['Plan']
+  assert index in index_scans(plan)
+
+
+def test_advisor_finds_no_seq_scans(catalog):
+  assert server.advise_indexes(verbose=False) == []
@@ -0,0 +1,28 @@
+"""
+Logging in gives the pooled connection back while the password is checked.
+"""
+import json
+import logging
+
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+import server
+
+
+def test_login_rehash_is_logged(client, db, caplog, monkeypatch):
+  monkeypatch.setitem(server.app.config, 'PREPARED_STATEMENTS', False)
+  monkeypatch.setitem(server.app.config, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+  with db.begin() as conn:
+    conn.execute(text("INSERT INTO users (username, password, user_profile) VALUES ('cook', :password, '')"),
+                 {'password': generate_password_hash('secret', method='pbkdf2:sha256:1000')})
+  with caplog.at_level(logging.INFO, logger='server.requests'):
+    response = client.post('/login', data={'username': 'cook', 'password': 'secret'})
+  assert response.status_code == 302
+  # the login query and the UPDATE of the rehashed password, both counted once the request ends
+  assert 'desc="2 statements"' in response.headers['Server-Timing']
+  logged = [json.loads(record.getMessage()) for record in caplog.records if record.name == 'server.requests']
+  assert [(entry['route'], entry['status'], entry['statements']) for entry in logged] == [('/login', 302, 2)]
+  with db.connect() as conn:
+    password = conn.execute(text("SELECT password FROM users WHERE username = 'cook'")).scalar()
+  assert password.startswith('pbkdf2:sha256:2000$')
@@ -0,0 +1,20 @@
+"""
+/metrics and /stats answer this host, or anyone with METRICS_TOKEN.
+"""
+import server
+
+
+def test_metrics_access(client):
+  for path in ('/metrics', '/stats'):
+    assert client.get(path).status_code == 200
+    assert client.get(path, environ_base={'REMOTE_ADDR': '203.0.113.7'}).status_code == 403
+
+  server.app.config['METRICS_TOKEN'] = 'secret'
+  try:
+    for path in ('/metrics', '/stats'):
+      assert client.get(path).status_code == 403
+      assert client.get(path, headers={'Authorization': 'Bearer wrong'}).status_code == 403
+      assert client.get(path, environ_base={'REMOTE_ADDR': '203.0.113.7'},
+                        headers={'Authorization': 'Bearer secret'}).status_code == 200
+  finally:
+    server.app.config['METRICS_TOKEN'] = ''
@@ -0,0 +1,39 @@
+"""
+A new recipe is written with a fixed number of statements, whatever its number of ingredients.
+"""
+import pytest
+from sqlalchemy import text
+
+import server
+from conftest import add_recipes, counted_statements, log_in
+
+
+pytestmark = pytest.mark.usefixtures('unprepared')
+
+
+@pytest.mark.parametrize('count', [1, 3, 40])
+def test_user_new_recipe(client, cook, db, count):
+  user_id, cid = cook
+  # 'salt' exists already, the others are new
+  add_recipes(db, user_id, 1, ingredients=['salt'])
+  log_in(client, user_id)
+  names = ['salt'] + ['spice %d' % i for i in range(1, count)]
+  form = {'name': 'stew', 'instruction': 'simmer', 'prep_time': '5', 'cook_time': '60', 'serving': '4',
+          'category_id': str(cid),
+          # a repeated and an empty row are skipped
+          'ingredient_name[]': names + ['salt', ''],
+          'amount[]': [str(i + 1) for i in range(count)] + ['9', '1'],
+          'unit[]': ['g'] * count + ['g', 'g']}
+  with counted_statements(server.engine) as counted:
+    response = client.post('/user_new_recipe', data=form)
+  assert response.status_code == 302
+  # the recipe, then its category and ingredients
+  assert len(counted) == 2
+  with db.connect() as conn:
+    recipe_id, cids, ingredients = conn.execute(text("SELECT recipe_id, category_ids, ingredients FROM recipe_view \
+                                                      WHERE recipe_name = 'stew'")).one()
+    linked = conn.execute(text("SELECT name, amount FROM use WHERE recipe_id = :recipe_id"),
+                          {'recipe_id': recipe_id}).all()
+  assert cids == [cid]
+  assert sorted(linked) == sorted((name, float(i + 1)) for i, name in enumerate(names))
+  assert ingredients.count(': ') == count
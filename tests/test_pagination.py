@@ -0,0 +1,40 @@
+"""
+The all recipes page is keyset-paginated, recipes without a date come last.
+"""
+import re
+
+from sqlalchemy import text
+
+import server
+from conftest import add_recipes, log_in
+
+RECIPE_IDS = re.compile(r'<tr>\s*<td>(\d+)</td>')
+CURSOR = re.compile(r'(after|before)=([^"&]+)')
+
+
+def page(client, query=''):
+  body = client.get('/loggedin_user_all_recipes' + query).get_data(as_text=True)
+  return [int(recipe_id) for recipe_id in RECIPE_IDS.findall(body)], dict(CURSOR.findall(body))
+
+
+def test_pages_past_recipes_without_a_date(client, cook, db, monkeypatch):
+  user_id, cid = cook
+  monkeypatch.setitem(server.app.config, 'RECIPE_PAGE_SIZE', 2)
+  recipe_ids = add_recipes(db, user_id, 5)
+  with db.begin() as conn:
+    conn.execute(text("UPDATE rec_upload SET on_date = NULL WHERE recipe_id = ANY(:recipe_ids)"),
+                 {'recipe_ids': recipe_ids[1:4:2]})
+  log_in(client, user_id)
+  # newest first, then the undated ones
+  expected = [recipe_ids[0], recipe_ids[2], recipe_ids[4], recipe_ids[3], recipe_ids[1]]
+
+  pages = [page(client)]
+  while 'after' in pages[-1][1]:
+    pages.append(page(client, '?after=' + pages[-1][1]['after']))
+  assert [recipe_id for shown, cursors in pages for recipe_id in shown] == expected
+  assert len(pages) == 3
+
+  # and back from the last page
+  shown, cursors = pages[-1]
+  back = page(client, '?before=' + cursors['before'])
+  assert back[0] == pages[1][0]
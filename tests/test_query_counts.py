@@ -0,0 +1,46 @@
+"""
+The listing pages run a fixed number of statements, whatever the number of
+recipes they show (no query per recipe for its ingredients or card).
+"""
+import pytest
+
+import server
+from conftest import add_recipes, counted_statements, log_in, statements
+
+
+pytestmark = pytest.mark.usefixtures('unprepared')
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_category_recipes_statements(client, cook, db, monkeypatch, streaming):
+  monkeypatch.setitem(server.app.config, 'STREAM_TEMPLATES', streaming)
+  user_id, cid = cook
+  counts = []
+  for count in (3, 30):
+    add_recipes(db, user_id, count, cid)
+    server.fragment_cache.data.clear()
+    # a streamed page runs its query after the Server-Timing header is sent
+    with counted_statements(server.engine) as counted:
+      response = client.get('/category/%d/recipes' % cid)
+      body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert body.count('class="recipe-card"') == len(counts) * 3 + count
+    assert 'Salt: 1.0 g' in body
+    counts.append(len(counted))
+  assert counts == [1, 1]
+
+
+def test_home_statements(client, cook, db):
+  user_id, cid = cook
+  log_in(client, user_id)
+  counts = []
+  for count in (2, 20):
+    add_recipes(db, user_id, count, cid)
+    server.cache.data.clear()
+    server.fragment_cache.data.clear()
+    response = client.get('/login/home')
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).count('class="recipe-card"') >= len(counts) * 2 + count
+    counts.append(statements(response))
+  # categories, the user's recipes and the feed
+  assert counts == [3, 3]
@@ -0,0 +1,67 @@
+"""
+Rendered recipe cards are cached under the version of their recipe_view row.
+"""
+import threading
+
+from sqlalchemy import text
+
+import server
+from conftest import add_recipes
+
+
+def test_cards_follow_recipe_versions(client, cook, db):
+  user_id, cid = cook
+  recipe_ids = add_recipes(db, user_id, 30, cid)
+  path = '/category/%d/recipes' % cid
+  assert client.get(path).get_data(as_text=True).count('class="recipe-card"') == 30
+  assert server.fragment_cache.stats()['entries'] == 30
+  # no entry per recipe in the shared cache
+  assert not [key for key in server.cache.data if key.startswith('version:recipe:')]
+
+  client.get(path)
+  assert server.fragment_cache.stats()['entries'] == 30
+
+  with db.begin() as conn:
+    conn.execute(text("UPDATE rec_upload SET instruction = 'stir well' WHERE recipe_id = :recipe_id"),
+                 {'recipe_id': recipe_ids[0]})
+    conn.execute(text("INSERT INTO ingredients (name, unit) VALUES ('pepper', 'g')"))
+    conn.execute(text("INSERT INTO use (recipe_id, name, amount) VALUES (:recipe_id, 'pepper', 1)"),
+                 {'recipe_id': recipe_ids[1]})
+    # counters aren't on the card, they leave its version alone
+    conn.execute(text("UPDATE recipe_view SET review_count = 5 WHERE recipe_id = :recipe_id"),
+                 {'recipe_id': recipe_ids[2]})
+  server.bump_version('recipes')
+  misses = server.fragment_cache.misses
+  body = client.get(path).get_data(as_text=True)
+  assert 'stir well' in body
+  assert 'Pepper: 1.0 g' in body
+  assert server.fragment_cache.misses - misses == 2
+
+
+def test_concurrent_refreshes(cook, db):
+  # a second refresh of a row another transaction is refreshing waits for it
+  # and updates the row, instead of failing on the primary key
+  user_id, cid = cook
+  recipe_id, = add_recipes(db, user_id, 1, cid)
+  refresh = text("SELECT refresh_recipe_view(ARRAY[:recipe_id])")
+  errors = []
+  def second():
+    try:
+      with db.begin() as conn:
+        conn.execute(refresh, {'recipe_id': recipe_id})
+    except Exception as e:
+      errors.append(e)
+  with db.begin() as conn:
+    version = conn.execute(text("SELECT version FROM recipe_view WHERE recipe_id = :recipe_id"),
+                           {'recipe_id': recipe_id}).scalar()
+    conn.execute(refresh, {'recipe_id': recipe_id})
+    thread = threading.Thread(target=second)
+    thread.start()
+    thread.join(0.5)
+    assert thread.is_alive()
+  thread.join()
+  assert errors == []
+  with db.begin() as conn:
+    rows = conn.execute(text("SELECT version FROM recipe_view WHERE recipe_id = :recipe_id"),
+                        {'recipe_id': recipe_id}).scalars().all()
+  assert len(rows) == 1 and rows[0] > version
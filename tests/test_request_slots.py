@@ -0,0 +1,18 @@
+"""
+With `serve --streams`, the requests other than event streams share --threads slots.
+"""
+import threading
+
+import server
+
+
+def test_requests_wait_for_a_slot(client, monkeypatch):
+  monkeypatch.setattr(server, 'request_slots', threading.BoundedSemaphore(1))
+  monkeypatch.setitem(server.app.config, 'DB_POOL_TIMEOUT', 0.1)
+  server.cache.set('categories', [(1, 'Soups')])
+  assert client.get('/categories').status_code == 200
+  # the slot was given back, now it is taken by another request
+  server.request_slots.acquire()
+  assert client.get('/categories').status_code == 503
+  server.request_slots.release()
+  assert client.get('/categories').status_code == 200
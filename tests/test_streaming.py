@@ -0,0 +1,32 @@
+"""
+Streamed listing pages read their rows through a server side cursor.
+"""
+import server
+from conftest import add_recipes
+
+
+def test_stream_rows_leaves_connection_buffered(cook, db, monkeypatch):
+  # stream_results used to be set with g.conn.execution_options(), which changes
+  # the request's connection for every later statement, not only the streamed one
+  monkeypatch.setitem(server.app.config, 'STREAM_TEMPLATES', True)
+  monkeypatch.setitem(server.app.config, 'STREAM_BATCH_SIZE', 2)
+  user_id, cid = cook
+  recipe_ids = add_recipes(db, user_id, 5, cid)
+  with server.app.test_request_context():
+    rows = list(server.stream_rows(server.CATEGORY_RECIPES, {'cid': cid}))
+    assert sorted(row['recipe_id'] for row in rows) == recipe_ids
+    assert 'stream_results' not in server.g.conn.get_execution_options()
+    result = server.run_query(server.HOME_RECIPES, {'user_id': user_id})
+    # a client side cursor, server side ones are named
+    assert result.cursor.name is None
+    assert len(result.fetchall()) == 5
+
+
+def test_streamed_page(client, cook, db, monkeypatch):
+  monkeypatch.setitem(server.app.config, 'STREAM_TEMPLATES', True)
+  monkeypatch.setitem(server.app.config, 'STREAM_BATCH_SIZE', 2)
+  user_id, cid = cook
+  add_recipes(db, user_id, 5, cid)
+  response = client.get('/category/%d/recipes' % cid)
+  assert response.is_streamed
+  assert response.get_data(as_text=True).count('class="recipe-card"') == 5
@@ -0,0 +1,44 @@
+"""
+Replaying a batch of queued writes doesn't write anything twice.
+"""
+import datetime
+
+from sqlalchemy import text
+
+import server
+
+
+def test_replayed_announcements(cook, db):
+  user_id, cid = cook
+  at_time = datetime.datetime(2026, 1, 1, 12, 0, tzinfo=datetime.timezone.utc).isoformat()
+  rows = [{'user_id': user_id, 'link': 'https://example.com', 'content': 'bake sale', 'at_time': at_time,
+           'write_key': key} for key in ('first', 'second')]
+  with db.begin() as conn:
+    # a batch holding the same post twice, then the whole batch again
+    assert server.apply_writes(conn, 'announcement', rows[:1] * 2) == 1
+    assert server.apply_writes(conn, 'announcement', rows[:1]) == 0
+    # another post by the same author at the same time
+    assert server.apply_writes(conn, 'announcement', rows[1:]) == 1
+    # posts written directly have no key, they are never merged
+    direct = [dict(rows[0], write_key=None)]
+    assert server.apply_writes(conn, 'announcement', direct * 2) == 2
+  with db.connect() as conn:
+    assert conn.execute(text("SELECT count(*) FROM ann_post")).scalar() == 4
+
+
+def test_flush_queued_writes(client, cook, db, tmp_path, monkeypatch):
+  user_id, cid = cook
+  monkeypatch.setitem(server.app.config, 'WRITE_BEHIND', True)
+  monkeypatch.setattr(server, 'write_queue', server.WriteQueue(str(tmp_path / 'writes.sqlite3')))
+  with server.app.test_request_context():
+    server.session['user_id'] = user_id
+    assert server.user_write('announcement', link='https://example.com', content='bake sale') is None
+  queued = server.write_queue.pending()
+  assert server.flush_writes() == 1
+  # the same writes queued again, as after a crash between the commit and their removal
+  for write_id, kind, params in queued:
+    server.write_queue.put(kind, user_id, params)
+  assert server.flush_writes() == 1
+  assert server.write_queue.dropped == 0
+  with db.connect() as conn:
+    assert conn.execute(text("SELECT count(*) FROM ann_post")).scalar() == 1